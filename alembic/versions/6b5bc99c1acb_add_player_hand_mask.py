@@ -0,0 +1,24 @@
+"""Add player hand mask
+
+Revision ID: 6b5bc99c1acb
+Revises: 422f85f20c3c
+Create Date: 2025-07-02 10:14:37.512904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b5bc99c1acb'
+down_revision = '422f85f20c3c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('players', sa.Column('hand_mask', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('players', 'hand_mask')
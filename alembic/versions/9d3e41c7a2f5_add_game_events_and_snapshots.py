@@ -0,0 +1,50 @@
+"""Add game events and snapshots
+
+Revision ID: 9d3e41c7a2f5
+Revises: 6b5bc99c1acb
+Create Date: 2025-07-09 16:42:03.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3e41c7a2f5'
+down_revision = '6b5bc99c1acb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('game_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('game_room_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.Column('private', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['game_room_id'], ['game_rooms.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('game_room_id', 'version', name='uq_game_events_room_version')
+    )
+    op.create_index(op.f('ix_game_events_id'), 'game_events', ['id'], unique=False)
+    op.create_table('game_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('game_room_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('state', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['game_room_id'], ['game_rooms.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('game_room_id', 'version', name='uq_game_snapshots_room_version')
+    )
+    op.create_index(op.f('ix_game_snapshots_id'), 'game_snapshots', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_game_snapshots_id'), table_name='game_snapshots')
+    op.drop_table('game_snapshots')
+    op.drop_index(op.f('ix_game_events_id'), table_name='game_events')
+    op.drop_table('game_events')
@@ -0,0 +1,86 @@
+"""Add room lifecycle columns, indexes and archive tables
+
+Revision ID: c47e2b8d1f03
+Revises: 9d3e41c7a2f5
+Create Date: 2025-07-16 11:27:45.904615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e2b8d1f03'
+down_revision = '9d3e41c7a2f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('game_rooms', sa.Column('status', sa.String(), server_default='waiting', nullable=False))
+    op.add_column('game_rooms', sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+    # Finished games cannot be told apart from the old columns; they are archived once idle
+    op.execute(
+        "UPDATE game_rooms SET "
+        "status = CASE WHEN is_game_started THEN 'playing' ELSE 'waiting' END, "
+        "last_activity_at = created_at"
+    )
+    op.create_index('ix_game_rooms_status_id', 'game_rooms', ['status', 'id'], unique=False)
+    op.create_index('ix_game_rooms_status_last_activity_at', 'game_rooms', ['status', 'last_activity_at'], unique=False)
+    op.create_index(op.f('ix_players_game_room_id'), 'players', ['game_room_id'], unique=False)
+
+    op.create_table('game_rooms_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('room_code', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_game_started', sa.Boolean(), nullable=True),
+    sa.Column('current_turn', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_game_rooms_archive_room_code'), 'game_rooms_archive', ['room_code'], unique=False)
+    op.create_index(op.f('ix_game_rooms_archive_archived_at'), 'game_rooms_archive', ['archived_at'], unique=False)
+    op.create_table('players_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('player_id', sa.String(), nullable=True),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('is_ready', sa.Boolean(), nullable=True),
+    sa.Column('hand_mask', sa.BigInteger(), nullable=True),
+    sa.Column('game_room_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_players_archive_player_id'), 'players_archive', ['player_id'], unique=False)
+    op.create_index(op.f('ix_players_archive_game_room_id'), 'players_archive', ['game_room_id'], unique=False)
+    op.create_table('game_events_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('game_room_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.Column('private', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_game_events_archive_room_version', 'game_events_archive', ['game_room_id', 'version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_game_events_archive_room_version', table_name='game_events_archive')
+    op.drop_table('game_events_archive')
+    op.drop_index(op.f('ix_players_archive_game_room_id'), table_name='players_archive')
+    op.drop_index(op.f('ix_players_archive_player_id'), table_name='players_archive')
+    op.drop_table('players_archive')
+    op.drop_index(op.f('ix_game_rooms_archive_archived_at'), table_name='game_rooms_archive')
+    op.drop_index(op.f('ix_game_rooms_archive_room_code'), table_name='game_rooms_archive')
+    op.drop_table('game_rooms_archive')
+
+    op.drop_index(op.f('ix_players_game_room_id'), table_name='players')
+    op.drop_index('ix_game_rooms_status_last_activity_at', table_name='game_rooms')
+    op.drop_index('ix_game_rooms_status_id', table_name='game_rooms')
+    op.drop_column('game_rooms', 'last_activity_at')
+    op.drop_column('game_rooms', 'status')
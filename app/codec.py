@@ -0,0 +1,76 @@
+from typing import Any, Dict, List, Union
+import msgpack
+from app.models.card import Suit, card_index
+from app.schemas import WebSocketMessage
+
+JSON_SUBPROTOCOL = "spades.json.v1"
+MSGPACK_SUBPROTOCOL = "spades.msgpack.v1"
+
+# Fixed type codes for the binary encoding; unknown types travel as strings
+MESSAGE_TYPES: Dict[str, int] = {
+    "delta": 1,
+    "snapshot": 2,
+    "hand": 3,
+    "error": 4,
+    "player_connected": 5,
+    "player_disconnected": 6,
+    "sync": 7,
+    "ready": 8,
+    "start": 9,
+    "bid": 10,
+    "play": 11,
+}
+MESSAGE_NAMES: Dict[int, str] = {code: name for name, code in MESSAGE_TYPES.items()}
+
+
+class JsonCodec:
+    """Default encoding: one JSON object per text frame."""
+    subprotocol = JSON_SUBPROTOCOL
+    binary = False
+
+    def encode(self, message: WebSocketMessage) -> str:
+        return message.model_dump_json()
+
+    def decode(self, frame: Union[str, bytes]) -> WebSocketMessage:
+        return WebSocketMessage.model_validate_json(frame)
+
+
+class MsgPackCodec:
+    """Compact encoding: a MessagePack ``[type_code, data]`` array per binary frame.
+
+    Cards are sent as their 0-51 index everywhere, including snapshot hands.
+    """
+    subprotocol = MSGPACK_SUBPROTOCOL
+    binary = True
+
+    def encode(self, message: WebSocketMessage) -> bytes:
+        data = message.data
+        if message.type == "snapshot" and data and data.get("hand"):
+            data = dict(data, hand=_hand_indices(data["hand"]))
+        return msgpack.packb([MESSAGE_TYPES.get(message.type, message.type), data])
+
+    def decode(self, frame: Union[str, bytes]) -> WebSocketMessage:
+        if isinstance(frame, str):
+            raise ValueError("Expected a binary frame")
+        payload = msgpack.unpackb(frame)
+        if not isinstance(payload, list) or len(payload) != 2:
+            raise ValueError("Expected a [type, data] array")
+        message_type, data = payload
+        return WebSocketMessage(type=MESSAGE_NAMES.get(message_type, message_type), data=data)
+
+
+def _hand_indices(hand: List[Dict[str, Any]]) -> List[int]:
+    return [card_index(Suit(card["suit"]), card["value"]) for card in hand]
+
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = MsgPackCodec()
+CODECS = {codec.subprotocol: codec for codec in (MSGPACK_CODEC, JSON_CODEC)}
+
+
+def negotiate(requested: List[str]) -> Union[JsonCodec, MsgPackCodec]:
+    """Pick the first codec we support, in our order of preference, from the client's subprotocols."""
+    for subprotocol, codec in CODECS.items():
+        if subprotocol in requested:
+            return codec
+    return JSON_CODEC
@@ -1,52 +1,254 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from app.models.database_models import GameRoomDB, PlayerDB
+from datetime import datetime
+from typing import List, Dict, Any, Set
+from sqlalchemy import and_, bindparam, delete, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.models.database_models import (
+    GameEventArchiveDB,
+    GameEventDB,
+    GameRoomArchiveDB,
+    GameRoomDB,
+    GameSnapshotDB,
+    PlayerArchiveDB,
+    PlayerDB,
+)
+from app.models.game_room import ROOM_FINISHED, ROOM_PLAYING
 
 class GameRoomDAO:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_room(self, room_code: str) -> GameRoomDB:
+    async def create_room(self, room_code: str) -> GameRoomDB:
         db_room = GameRoomDB(room_code=room_code)
         self.db.add(db_room)
-        self.db.commit()
-        self.db.refresh(db_room)
+        await self.db.flush()
         return db_room
 
-    def get_room_by_code(self, room_code: str) -> Optional[GameRoomDB]:
-        return self.db.query(GameRoomDB).filter(GameRoomDB.room_code == room_code).first()
+    async def create_rooms(self, room_codes: List[str]) -> Dict[str, int]:
+        """Insert many rooms in one executemany INSERT ... RETURNING. Returns their ids by room code."""
+        if not room_codes:
+            return {}
+        rooms = GameRoomDB.__table__
+        result = await self.db.execute(
+            insert(rooms).returning(rooms.c.id, rooms.c.room_code, sort_by_parameter_order=True),
+            [{"room_code": room_code} for room_code in room_codes],
+        )
+        return {room_code: room_id for room_id, room_code in result.all()}
 
-    def update_room_state(self, db_room: GameRoomDB, is_game_started: bool, current_turn: Optional[str] = None) -> GameRoomDB:
-        db_room.is_game_started = is_game_started
-        if current_turn:
-            db_room.current_turn = current_turn
-        self.db.commit()
-        self.db.refresh(db_room)
-        return db_room
+    async def get_rooms_with_players(self, room_codes: List[str]) -> List[GameRoomDB]:
+        """Fetch rooms and their players in two queries, however many rooms are asked for."""
+        if not room_codes:
+            return []
+        result = await self.db.execute(
+            select(GameRoomDB)
+            .options(selectinload(GameRoomDB.players))
+            .where(GameRoomDB.room_code.in_(room_codes))
+        )
+        return list(result.scalars().all())
+
+    async def get_started_rooms_with_players(self, after_id: int = 0, limit: int = 500) -> List[GameRoomDB]:
+        """Fetch the next page of in-progress rooms (keyset-paginated on id) with their players."""
+        result = await self.db.execute(
+            select(GameRoomDB)
+            .options(selectinload(GameRoomDB.players))
+            .where(GameRoomDB.status == ROOM_PLAYING, GameRoomDB.id > after_id)
+            .order_by(GameRoomDB.id)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_taken_codes(self, room_codes: List[str]) -> Set[str]:
+        """Return which of ``room_codes`` already belong to a room."""
+        if not room_codes:
+            return set()
+        result = await self.db.execute(select(GameRoomDB.room_code).where(GameRoomDB.room_code.in_(room_codes)))
+        return set(result.scalars().all())
+
+    async def update_room_states(self, states: List[Dict[str, Any]]) -> None:
+        """Write many rooms in one executemany UPDATE keyed on room_code.
+
+        Each dict needs ``room_code``, ``is_game_started``, ``current_turn``,
+        ``status`` and ``last_activity_at``; a ``None`` turn leaves the stored
+        value untouched.
+        """
+        if not states:
+            return
+        rooms = GameRoomDB.__table__
+        stmt = (
+            update(rooms)
+            .where(rooms.c.room_code == bindparam("b_room_code"))
+            .values(
+                is_game_started=bindparam("b_is_game_started"),
+                current_turn=func.coalesce(bindparam("b_current_turn"), rooms.c.current_turn),
+                status=bindparam("b_status"),
+                last_activity_at=bindparam("b_last_activity_at"),
+            )
+        )
+        await self.db.execute(stmt, [
+            {
+                "b_room_code": state["room_code"],
+                "b_is_game_started": state["is_game_started"],
+                "b_current_turn": state["current_turn"],
+                "b_status": state["status"],
+                "b_last_activity_at": state["last_activity_at"],
+            }
+            for state in states
+        ])
 
 class PlayerDAO:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_player(self, player_id: str, name: str, game_room_id: int) -> PlayerDB:
+    async def create_player(self, player_id: str, name: str, game_room_id: int) -> PlayerDB:
         db_player = PlayerDB(
             player_id=player_id,
             name=name,
             game_room_id=game_room_id
         )
         self.db.add(db_player)
-        self.db.commit()
-        self.db.refresh(db_player)
+        await self.db.flush()
         return db_player
 
-    def get_player(self, player_id: str, game_room_id: int) -> Optional[PlayerDB]:
-        return self.db.query(PlayerDB).filter(
-            PlayerDB.player_id == player_id,
-            PlayerDB.game_room_id == game_room_id
-        ).first()
-
-    def update_player_ready(self, db_player: PlayerDB, is_ready: bool) -> PlayerDB:
-        db_player.is_ready = is_ready
-        self.db.commit()
-        self.db.refresh(db_player)
-        return db_player
\ No newline at end of file
+    async def create_players(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert many players in one executemany INSERT.
+
+        Each dict needs ``player_id``, ``name`` and ``game_room_id``.
+        """
+        if not rows:
+            return
+        await self.db.execute(insert(PlayerDB.__table__), rows)
+
+    async def update_player_states(self, states: List[Dict[str, Any]]) -> None:
+        """Write many players in one executemany UPDATE keyed on player_id.
+
+        Each dict needs ``player_id``, ``is_ready`` and ``hand_mask``.
+        """
+        if not states:
+            return
+        players = PlayerDB.__table__
+        stmt = (
+            update(players)
+            .where(players.c.player_id == bindparam("b_player_id"))
+            .values(is_ready=bindparam("b_is_ready"), hand_mask=bindparam("b_hand_mask"))
+        )
+        await self.db.execute(stmt, [
+            {
+                "b_player_id": state["player_id"],
+                "b_is_ready": state["is_ready"],
+                "b_hand_mask": state["hand_mask"],
+            }
+            for state in states
+        ])
+
+class GameEventDAO:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def append_events(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert many events in one executemany INSERT.
+
+        Each dict needs ``game_room_id``, ``version``, ``type``, ``data`` and ``private``.
+        """
+        if not rows:
+            return
+        await self.db.execute(insert(GameEventDB.__table__), rows)
+
+    async def save_snapshots(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert many snapshots; each dict needs ``game_room_id``, ``version`` and ``state``."""
+        if not rows:
+            return
+        await self.db.execute(insert(GameSnapshotDB.__table__), rows)
+
+    def _latest_snapshot_versions(self, room_ids: List[int]):
+        return (
+            select(GameSnapshotDB.game_room_id, func.max(GameSnapshotDB.version).label("version"))
+            .where(GameSnapshotDB.game_room_id.in_(room_ids))
+            .group_by(GameSnapshotDB.game_room_id)
+            .subquery()
+        )
+
+    async def get_latest_snapshots(self, room_ids: List[int]) -> Dict[int, GameSnapshotDB]:
+        """Fetch the newest snapshot of each room in one query, keyed by room id."""
+        if not room_ids:
+            return {}
+        latest = self._latest_snapshot_versions(room_ids)
+        result = await self.db.execute(
+            select(GameSnapshotDB).join(
+                latest,
+                and_(GameSnapshotDB.game_room_id == latest.c.game_room_id, GameSnapshotDB.version == latest.c.version),
+            )
+        )
+        return {snapshot.game_room_id: snapshot for snapshot in result.scalars().all()}
+
+    async def get_events_since_snapshots(self, room_ids: List[int]) -> Dict[int, List[GameEventDB]]:
+        """Fetch, in one query, each room's events newer than its latest snapshot, in version order."""
+        if not room_ids:
+            return {}
+        latest = self._latest_snapshot_versions(room_ids)
+        result = await self.db.execute(
+            select(GameEventDB)
+            .outerjoin(latest, GameEventDB.game_room_id == latest.c.game_room_id)
+            .where(
+                GameEventDB.game_room_id.in_(room_ids),
+                GameEventDB.version > func.coalesce(latest.c.version, 0),
+            )
+            .order_by(GameEventDB.game_room_id, GameEventDB.version)
+        )
+        events: Dict[int, List[GameEventDB]] = {}
+        for event in result.scalars().all():
+            events.setdefault(event.game_room_id, []).append(event)
+        return events
+
+class ArchiveDAO:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_archivable_rooms(
+        self, finished_before: datetime, idle_before: datetime, after_id: int = 0, limit: int = 500
+    ) -> List[Any]:
+        """Lock and fetch the next page of ``(id, room_code)`` rows ready to archive, keyset-paginated on id.
+
+        Those are rooms finished before ``finished_before`` and rooms of any
+        status idle since before ``idle_before``. Rows already locked by
+        another worker's archiver are skipped (on databases that support it).
+        """
+        result = await self.db.execute(
+            select(GameRoomDB.id, GameRoomDB.room_code)
+            .where(
+                GameRoomDB.id > after_id,
+                or_(
+                    and_(GameRoomDB.status == ROOM_FINISHED, GameRoomDB.last_activity_at < finished_before),
+                    GameRoomDB.last_activity_at < idle_before,
+                ),
+            )
+            .order_by(GameRoomDB.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.all())
+
+    async def archive_rooms(self, room_ids: List[int], archived_at: datetime) -> None:
+        """Copy rooms, their players and their event logs into the archive tables, then delete them.
+
+        Snapshots are dropped rather than archived, since the archived event
+        log is enough to rebuild any of them.
+        """
+        if not room_ids:
+            return
+        for live, archive, room_column in (
+            (GameRoomDB, GameRoomArchiveDB, GameRoomDB.id),
+            (PlayerDB, PlayerArchiveDB, PlayerDB.game_room_id),
+            (GameEventDB, GameEventArchiveDB, GameEventDB.game_room_id),
+        ):
+            columns = [column.name for column in live.__table__.columns]
+            await self.db.execute(
+                insert(archive.__table__).from_select(
+                    columns + ["archived_at"],
+                    select(*live.__table__.columns, literal(archived_at)).where(room_column.in_(room_ids)),
+                )
+            )
+        # Children first, for the foreign keys on game_room_id
+        await self.db.execute(delete(GameSnapshotDB.__table__).where(GameSnapshotDB.game_room_id.in_(room_ids)))
+        await self.db.execute(delete(GameEventDB.__table__).where(GameEventDB.game_room_id.in_(room_ids)))
+        await self.db.execute(delete(PlayerDB.__table__).where(PlayerDB.game_room_id.in_(room_ids)))
+        await self.db.execute(delete(GameRoomDB.__table__).where(GameRoomDB.id.in_(room_ids)))
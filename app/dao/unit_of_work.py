@@ -0,0 +1,49 @@
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction, async_sessionmaker
+from app.database import AsyncSessionLocal
+from app.dao.game_dao import ArchiveDAO, GameEventDAO, GameRoomDAO, PlayerDAO
+
+
+class UnitOfWork:
+    """A session and transaction scoped to one request or WebSocket command.
+
+    DAOs only flush; the unit of work commits once on a clean exit, rolls back
+    on error and always returns the connection to the pool.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.session: Optional[AsyncSession] = None
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self.session = self.session_factory()
+        self.rooms = GameRoomDAO(self.session)
+        self.players = PlayerDAO(self.session)
+        self.events = GameEventDAO(self.session)
+        self.archive = ArchiveDAO(self.session)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+        finally:
+            await self.session.close()
+
+    async def commit(self) -> None:
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
+
+    def savepoint(self) -> AsyncSessionTransaction:
+        """A nested transaction, so a failed statement can be retried without losing the rest of the work"""
+        return self.session.begin_nested()
+
+
+async def get_uow():
+    """Dependency that wraps each request in its own unit of work"""
+    async with UnitOfWork() as uow:
+        yield uow
@@ -0,0 +1,305 @@
+"""Stream rooms, players and game events to CSV or Parquet files for analytics.
+
+Rows are read in batches through a server-side cursor (or with Postgres
+``COPY ... TO STDOUT`` for CSV) and written as they arrive, so memory use
+does not grow with the tables. Each run writes one file per dataset:
+
+    python -m app.export --output exports --format parquet
+
+A ``watermarks.json`` in the output directory records how far each dataset
+was exported, so the next run only writes rows added or changed since:
+
+- ``game_rooms`` and ``players`` by the room's ``last_activity_at``, so a
+  room and its players are exported again whenever the room changes
+- ``game_events`` by id, since the log is append-only
+- the ``*_archive`` tables by ``archived_at``
+
+Rows newer than ``--lag`` seconds are left for the next run, so rows from
+transactions still in flight are not skipped. Ids are preserved, so rows
+exported twice (a room that changed again, or events exported before they
+were archived) can be deduplicated on id. Parquet output needs ``pyarrow``.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from sqlalchemy import Boolean, DateTime, Integer, JSON, and_, func, select
+from sqlalchemy.engine import Engine
+from app.models.database_models import (
+    GameEventArchiveDB,
+    GameEventDB,
+    GameRoomArchiveDB,
+    GameRoomDB,
+    PlayerArchiveDB,
+    PlayerDB,
+)
+
+logger = logging.getLogger(__name__)
+
+WATERMARKS_FILE = "watermarks.json"
+
+rooms = GameRoomDB.__table__
+players = PlayerDB.__table__
+events = GameEventDB.__table__
+rooms_archive = GameRoomArchiveDB.__table__
+players_archive = PlayerArchiveDB.__table__
+events_archive = GameEventArchiveDB.__table__
+
+
+def _between(column, since: Optional[datetime], until: datetime):
+    return column <= until if since is None else and_(column > since, column <= until)
+
+
+def _archived(table, since: Optional[datetime], until: datetime):
+    # Children are found through the archived rooms, which are indexed on archived_at
+    archived_rooms = select(rooms_archive.c.id).where(_between(rooms_archive.c.archived_at, since, until))
+    return select(table).where(table.c.game_room_id.in_(archived_rooms)).order_by(table.c.id)
+
+
+# Per dataset: the table, and a query for the rows in a (since, until] time window
+TIME_WINDOWED: Dict[str, Any] = {
+    "game_rooms": (
+        rooms,
+        lambda since, until: select(rooms).where(_between(rooms.c.last_activity_at, since, until)).order_by(rooms.c.id),
+    ),
+    "players": (
+        players,
+        lambda since, until: (
+            select(players)
+            .join(rooms, players.c.game_room_id == rooms.c.id)
+            .where(_between(rooms.c.last_activity_at, since, until))
+            .order_by(players.c.id)
+        ),
+    ),
+    "game_rooms_archive": (
+        rooms_archive,
+        lambda since, until: (
+            select(rooms_archive)
+            .where(_between(rooms_archive.c.archived_at, since, until))
+            .order_by(rooms_archive.c.id)
+        ),
+    ),
+    "players_archive": (players_archive, lambda since, until: _archived(players_archive, since, until)),
+    "game_events_archive": (events_archive, lambda since, until: _archived(events_archive, since, until)),
+}
+
+DATASETS = ["game_rooms", "players", "game_events", "game_rooms_archive", "players_archive", "game_events_archive"]
+
+
+def _csv_value(value: Any, column) -> Any:
+    # Match what Postgres COPY writes, so both paths produce the same files
+    if value is None:
+        return ""
+    if isinstance(column.type, JSON):
+        return json.dumps(value, separators=(",", ":"))
+    if isinstance(column.type, Boolean):
+        return "t" if value else "f"
+    return value
+
+
+class CsvWriter:
+    def __init__(self, path: str, columns: List[Any]):
+        self.columns = columns
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([column.name for column in columns])
+
+    def write(self, rows: List[Any]) -> None:
+        self.writer.writerows([
+            [_csv_value(value, column) for value, column in zip(row, self.columns)]
+            for row in rows
+        ])
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes each batch as a Parquet row group"""
+
+    def __init__(self, path: str, columns: List[Any]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.columns = columns
+        self.types = [self._arrow_type(column) for column in columns]
+        self.schema = pa.schema([(column.name, type_) for column, type_ in zip(columns, self.types)])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def _arrow_type(self, column):
+        pa = self.pa
+        if isinstance(column.type, Integer):  # BigInteger included
+            return pa.int64()
+        if isinstance(column.type, Boolean):
+            return pa.bool_()
+        if isinstance(column.type, DateTime):
+            return pa.timestamp("us")
+        # Strings, and JSON serialized as strings, since event payloads differ by type
+        return pa.string()
+
+    def write(self, rows: List[Any]) -> None:
+        arrays = []
+        for index, (column, type_) in enumerate(zip(self.columns, self.types)):
+            values = [row[index] for row in rows]
+            if isinstance(column.type, JSON):
+                values = [None if value is None else json.dumps(value, separators=(",", ":")) for value in values]
+            arrays.append(self.pa.array(values, type=type_))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+WRITERS: Dict[str, Callable[[str, List[Any]], Any]] = {"csv": CsvWriter, "parquet": ParquetWriter}
+
+
+class Exporter:
+    """Exports each dataset's rows since its watermark into ``output_dir/<dataset>/``"""
+
+    def __init__(
+        self,
+        engine: Engine,
+        output_dir: str,
+        format: str = "parquet",
+        batch_size: int = 10000,
+        lag: float = 60.0,
+        use_copy: bool = True,
+    ):
+        if format not in WRITERS:
+            raise ValueError(f"Unknown export format '{format}'")
+        self.engine = engine
+        self.output_dir = output_dir
+        self.format = format
+        self.batch_size = batch_size
+        self.lag = lag
+        self.use_copy = use_copy and format == "csv" and engine.dialect.name == "postgresql"
+        self.watermarks_path = os.path.join(output_dir, WATERMARKS_FILE)
+        self.watermarks = self._load_watermarks()
+
+    def _load_watermarks(self) -> Dict[str, Any]:
+        if not os.path.exists(self.watermarks_path):
+            return {}
+        with open(self.watermarks_path) as file:
+            return json.load(file)
+
+    def _save_watermarks(self) -> None:
+        path = self.watermarks_path + ".tmp"
+        with open(path, "w") as file:
+            json.dump(self.watermarks, file, indent=2, sort_keys=True)
+        os.replace(path, self.watermarks_path)
+
+    def run(self, datasets: List[str] = DATASETS, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Export every dataset in turn. Returns the number of rows written per dataset."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        until = (now or datetime.utcnow()) - timedelta(seconds=self.lag)
+        return {dataset: self.export(dataset, until) for dataset in datasets}
+
+    def export(self, dataset: str, until: datetime) -> int:
+        """Write one dataset's new rows to a file and advance its watermark. Returns the rows written."""
+        with self.engine.connect() as connection:
+            if dataset == "game_events":
+                table = events
+                after_id = self.watermarks.get(dataset, 0)
+                # The lag picks the upper id; the rows are then bounded by id alone, since a
+                # created_at filter could skip ids below the watermark that never get exported
+                last_id = connection.execute(
+                    select(func.max(events.c.id)).where(events.c.id > after_id, events.c.created_at <= until)
+                ).scalar()
+                if last_id is None:
+                    return 0
+                query = select(events).where(events.c.id > after_id, events.c.id <= last_id).order_by(events.c.id)
+                watermark: Any = last_id
+            else:
+                table, window = TIME_WINDOWED[dataset]
+                since = self.watermarks.get(dataset)
+                query = window(datetime.fromisoformat(since) if since else None, until)
+                watermark = until.isoformat()
+
+            directory = os.path.join(self.output_dir, dataset)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{dataset}-{until:%Y%m%dT%H%M%S_%f}.{self.format}")
+            partial = path + ".partial"
+            try:
+                if self.use_copy:
+                    count = self._copy(connection, query, partial)
+                else:
+                    count = self._stream(connection, query, list(table.columns), partial)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+
+        if count:
+            os.replace(partial, path)
+            logger.info(f"Exported {count} rows of {dataset} to {path}")
+        else:
+            os.remove(partial)
+        self.watermarks[dataset] = watermark
+        self._save_watermarks()
+        return count
+
+    def _stream(self, connection, query, columns: List[Any], path: str) -> int:
+        writer = WRITERS[self.format](path, columns)
+        count = 0
+        try:
+            # yield_per streams through a server-side cursor where the driver has one
+            result = connection.execution_options(yield_per=self.batch_size).execute(query)
+            for rows in result.partitions():
+                writer.write(rows)
+                count += len(rows)
+        finally:
+            writer.close()
+        return count
+
+    def _copy(self, connection, query, path: str) -> int:
+        compiled = query.compile(dialect=self.engine.dialect)
+        cursor = connection.connection.cursor()
+        try:
+            sql = cursor.mogrify(str(compiled), compiled.params).decode()
+            with open(path, "w", newline="") as file:
+                cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", file)
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="exports", help="directory for the files and watermarks")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="parquet")
+    parser.add_argument("--datasets", default=",".join(DATASETS), help="comma-separated subset to export")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows fetched and written at a time")
+    parser.add_argument("--lag", type=float, default=60.0, help="seconds of the newest rows left for the next run")
+    parser.add_argument("--no-copy", action="store_true", help="stream CSV through a cursor even on Postgres")
+    parser.add_argument("--full", action="store_true", help="ignore the datasets' watermarks and export everything")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    datasets = [dataset.strip() for dataset in args.datasets.split(",") if dataset.strip()]
+    unknown = set(datasets) - set(DATASETS)
+    if unknown:
+        print(f"Unknown datasets: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    from app.database import engine
+
+    exporter = Exporter(engine, args.output, args.format, args.batch_size, args.lag, use_copy=not args.no_copy)
+    if args.full:
+        for dataset in datasets:
+            exporter.watermarks.pop(dataset, None)
+    for dataset, count in exporter.run(datasets).items():
+        print(f"{dataset:<22}{count:>12} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,28 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.websockets import WebSocket
-from sqlalchemy.orm import Session
-from app.database import get_db, init_db, check_db_connection
+from fastapi.requests import HTTPConnection
+from fastapi.responses import StreamingResponse
+from fastapi.websockets import WebSocket, WebSocketDisconnect
+from typing import Optional
+from app.database import async_engine, engine, init_db, check_async_db_connection
+from app.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, register_collectors, render as render_metrics
+from app.profiler import ProfilerMiddleware, profiled
+from app.dao.unit_of_work import UnitOfWork, get_uow
 from app.config import settings
+from app.codec import negotiate
 from app.services.game_service import GameService
+from app.services.connection_hub import ConnectionHub
+from app.services.cluster import create_cluster
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.models.rules import IllegalMoveError
 from app.schemas import (
     JoinRoomRequest,
     CreateRoomResponse,
+    QuickJoinResponse,
+    ProvisionRoomsRequest,
+    ProvisionRoomsResponse,
+    ProvisionedRoom,
+    SeatedPlayer,
     GameState,
     WebSocketMessage,
     PlayerInfo
@@ -34,9 +49,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and SQL statement counts for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in SQL profiling with N+1 detection; see app/profiler.py
+if settings.profile_requests:
+    app.add_middleware(ProfilerMiddleware)
+
 # Global game service instance
 game_service = None
 
+# Which rooms this worker owns, and the bus to the other workers
+cluster = create_cluster()
+
+# Registry of open WebSockets, per room
+connection_hub = ConnectionHub(bus=cluster.bus, node_id=cluster.node_id)
+
+# Rate and concurrency limits for creating, joining and connecting to rooms
+admission = AdmissionController()
+
+# Metrics read from the engines, the game service and admission control whenever /metrics is scraped
+register_collectors({"async": async_engine, "sync": engine}, lambda: game_service, admission)
+
+
+def route_to_owner(room_code: str, request: Request):
+    """Redirect room requests to the worker that owns the room"""
+    if not cluster.owns(room_code):
+        location = cluster.owner_of(room_code) + request.url.path
+        if request.url.query:
+            location += f"?{request.url.query}"
+        raise HTTPException(status_code=307, detail="Room is hosted by another worker", headers={"Location": location})
+
+
+def client_address(connection: HTTPConnection) -> str:
+    """The address rate limits are keyed on"""
+    if settings.trust_forwarded_for:
+        forwarded = connection.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return connection.client.host if connection.client else "unknown"
+
+
+async def admit(request: Request):
+    """Shed new load with 429 or 503 and Retry-After once the admission limits are reached"""
+    try:
+        admission.acquire(client_address(request), request.path_params.get("room_code"))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    try:
+        yield
+    finally:
+        admission.release()
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -46,7 +110,7 @@ async def startup_event():
     logger.info("Starting Spades3 API...")
     
     # Check database connection
-    if not check_db_connection():
+    if not await check_async_db_connection():
         logger.error("Failed to connect to database")
         raise Exception("Database connection failed")
     
@@ -60,9 +124,13 @@ async def startup_event():
     
     # Initialize game service
     try:
-        db = next(get_db())
-        game_service = GameService(db)
+        game_service = GameService(hub=connection_hub, cluster=cluster)
+        await game_service.start()
         logger.info("Game service initialized successfully")
+        if settings.warm_start:
+            async with UnitOfWork() as uow:
+                loaded = await game_service.warm_start(uow)
+            logger.info(f"Warm start loaded {loaded} in-progress rooms")
     except Exception as e:
         logger.error(f"Failed to initialize game service: {e}")
         raise
@@ -74,6 +142,9 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on application shutdown"""
     logger.info("Shutting down Spades3 API...")
+    if game_service:
+        await game_service.stop()
+    await async_engine.dispose()
 
 
 @app.get("/")
@@ -89,48 +160,133 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Detailed health check endpoint"""
-    db_status = check_db_connection()
+    db_status = await check_async_db_connection()
     return {
         "status": "healthy" if db_status else "unhealthy",
         "database": "connected" if db_status else "disconnected",
-        "version": settings.app_version
+        "version": settings.app_version,
+        "room_cache": game_service.active_games.stats() if game_service else None,
+        "rooms": game_service.directory.stats() if game_service else None,
+        "admission": admission.stats(),
+        "state_cache": game_service.state_cache.stats() if game_service else None
     }
 
 
-@app.post("/rooms/create", response_model=CreateRoomResponse)
-async def create_room(db: Session = Depends(get_db)):
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this worker"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.post("/rooms/create", response_model=CreateRoomResponse, dependencies=[Depends(admit)])
+async def create_room(uow: UnitOfWork = Depends(get_uow)):
     """Create a new game room"""
     try:
-        room_code = game_service.create_room()
+        room_code = await game_service.create_room(uow)
         return CreateRoomResponse(room_code=room_code)
     except Exception as e:
         logger.error(f"Failed to create room: {e}")
         raise HTTPException(status_code=500, detail="Failed to create room")
 
 
-@app.post("/rooms/{room_code}/join")
-async def join_room(room_code: str, player: JoinRoomRequest, db: Session = Depends(get_db)):
+@app.post("/rooms/quick-join", response_model=QuickJoinResponse, dependencies=[Depends(admit)])
+async def quick_join(player: JoinRoomRequest, uow: UnitOfWork = Depends(get_uow)):
+    """Join the fullest open room on this worker, or a new one"""
+    try:
+        room_code, player_id = await game_service.quick_join(uow, player.player_name)
+        return QuickJoinResponse(room_code=room_code, player_id=player_id)
+    except Exception as e:
+        logger.error(f"Failed to quick-join: {e}")
+        raise HTTPException(status_code=500, detail="Failed to join a room")
+
+
+@app.post("/rooms/provision", response_model=ProvisionRoomsResponse, dependencies=[Depends(admit)])
+async def provision_rooms(request: ProvisionRoomsRequest, uow: UnitOfWork = Depends(get_uow)):
+    """Create many rooms at once and seat their players, for tournaments
+
+    The rooms are hosted by this worker; clients connect to them as usual.
+    """
+    if len(request.tables) > settings.provision_max_tables:
+        raise HTTPException(status_code=422, detail=f"At most {settings.provision_max_tables} tables per request")
+    try:
+        seatings = await game_service.provision_rooms(uow, request.tables)
+        return ProvisionRoomsResponse(rooms=[
+            ProvisionedRoom(
+                room_code=room_code,
+                players=[SeatedPlayer(player_name=name, player_id=player_id) for name, player_id in seated]
+            )
+            for room_code, seated in seatings
+        ])
+    except IllegalMoveError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to provision rooms: {e}")
+        raise HTTPException(status_code=500, detail="Failed to provision rooms")
+
+
+@app.post("/rooms/{room_code}/join", dependencies=[Depends(route_to_owner), Depends(admit)])
+async def join_room(room_code: str, player: JoinRoomRequest, uow: UnitOfWork = Depends(get_uow)):
     """Join an existing game room"""
     try:
-        player_id = game_service.join_room(room_code, player.player_name)
+        player_id = await game_service.join_room(uow, room_code, player.player_name)
         if not player_id:
             raise HTTPException(status_code=404, detail="Room not found")
         return {"player_id": player_id}
     except HTTPException:
         raise
+    except IllegalMoveError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to join room: {e}")
         raise HTTPException(status_code=500, detail="Failed to join room")
 
 
-@app.get("/rooms/{room_code}/state", response_model=GameState)
-async def get_game_state(room_code: str, db: Session = Depends(get_db)):
-    """Get current game state for a room"""
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+@app.get("/rooms/{room_code}/state", response_model=GameState, dependencies=[Depends(route_to_owner)])
+async def get_game_state(
+    room_code: str,
+    request: Request,
+    player_id: Optional[str] = None,
+    since: Optional[int] = None,
+    uow: UnitOfWork = Depends(get_uow)
+):
+    """Get current game state for a room
+
+    The ETag is the room version, so clients polling with If-None-Match get
+    an empty 304 until something changes. With ``since`` this is a long-poll:
+    while the room is still at that version the request waits for the next
+    change, and answers 304 if none comes before the timeout.
+    """
     try:
-        game_state = game_service.get_game_state(room_code)
-        if not game_state:
+        cached = await game_service.get_game_state_json(uow, room_code, player_id)
+        if not cached:
             raise HTTPException(status_code=404, detail="Room not found")
-        return game_state
+        if since is not None and cached[0] == since:
+            # Hand the pooled connection back before parking
+            await uow.commit()
+            if await game_service.wait_for_change(room_code, since):
+                cached = await game_service.get_game_state_json(uow, room_code, player_id)
+                if not cached:
+                    raise HTTPException(status_code=404, detail="Room not found")
+            else:
+                return Response(status_code=304, headers={"ETag": f'"{since}"'})
+        version, body = cached
+        headers = {
+            "ETag": f'"{version}"',
+            # Responses with a hand must not be shared, and must always be revalidated
+            "Cache-Control": "private, no-cache" if player_id else "no-cache",
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -138,27 +294,97 @@ async def get_game_state(room_code: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to get game state")
 
 
+@app.get("/rooms/{room_code}/events", dependencies=[Depends(route_to_owner)])
+async def stream_game_state(room_code: str, request: Request, player_id: Optional[str] = None):
+    """Server-Sent Events stream of the game state, for clients that cannot use WebSockets
+
+    Sends a ``state`` event now and after every change; its id is the room
+    version, so reconnecting clients resume with Last-Event-ID.
+    """
+    try:
+        async with UnitOfWork() as uow:
+            cached = await game_service.get_game_state_json(uow, room_code, player_id)
+        if not cached:
+            raise HTTPException(status_code=404, detail="Room not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to open state stream: {e}")
+        raise HTTPException(status_code=500, detail="Failed to open state stream")
+    last_event_id = request.headers.get("last-event-id")
+    since = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        game_service.stream_game_state(room_code, player_id, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def deny_websocket(websocket: WebSocket, e: AdmissionRejected) -> None:
+    """Refuse a WebSocket handshake with an HTTP status and Retry-After where the server supports it"""
+    if "websocket.http.response" in websocket.scope.get("extensions", {}):
+        await websocket.send_denial_response(Response(status_code=e.status_code, headers=e.headers))
+    else:
+        await websocket.close(code=1013)  # Try again later
+
+
 @app.websocket("/ws/{room_code}/{player_id}")
 async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: str):
-    """WebSocket endpoint for real-time game communication"""
-    await websocket.accept()
+    """WebSocket endpoint for real-time game communication
+
+    Clients may request the ``spades.msgpack.v1`` subprotocol for compact
+    binary frames; otherwise messages are JSON text frames.
+    """
+    try:
+        admission.acquire(client_address(websocket), room_code)
+    except AdmissionRejected as e:
+        await deny_websocket(websocket, e)
+        return
     
+    # Only the handshake counts against the in-flight limit, not the whole connection
     try:
-        # Load game if not in memory
-        if room_code not in game_service.active_games:
-            game_room = game_service.load_game(room_code)
+        requested = websocket.scope.get("subprotocols", [])
+        codec = negotiate(requested)
+        await websocket.accept(subprotocol=codec.subprotocol if codec.subprotocol in requested else None)
+        
+        # Load game if not in memory; rooms owned by another worker are checked there
+        if game_service.owns(room_code):
+            try:
+                async with UnitOfWork() as uow:
+                    game_room = await game_service.get_room(uow, room_code)
+            except Exception as e:
+                logger.error(f"WebSocket error: {e}")
+                await websocket.close(code=1011)
+                return
             if not game_room:
                 await websocket.close(code=1000)
                 return
+            if player_id not in game_room.players:
+                await websocket.close(code=1008)
+                return
         
-        # TODO: Implement WebSocket message handling
-        # This will be expanded in the next phase with event-driven architecture
-        
+        connection = await connection_hub.connect(websocket, room_code, player_id, codec)
+    finally:
+        admission.release()
+    
+    try:
+        await game_service.player_connected(room_code, player_id)
         while True:
-            # Keep connection alive
-            data = await websocket.receive_text()
-            # Process incoming messages here
-            
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            try:
+                message = codec.decode(frame["bytes"] if frame.get("bytes") is not None else frame["text"])
+            except ValueError:
+                connection_hub.send(room_code, player_id, WebSocketMessage(type="error", data={"message": "Invalid message"}))
+                continue
+            with profiled(f"WS {message.type}"):
+                await game_service.handle_message(room_code, player_id, message)
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        await websocket.close(code=1011)
\ No newline at end of file
+        await connection_hub.disconnect(connection, code=1011)
+    finally:
+        await connection_hub.disconnect(connection)
+        game_service.player_disconnected(room_code, player_id)
@@ -1,17 +1,38 @@
-from app.models.database_models import GameRoomDB, PlayerDB
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+from app.models.card import Card, Hand
+from app.models.database_models import GameEventDB, GameRoomDB, GameSnapshotDB, PlayerDB
+from app.models.events import GameEvent
 from app.models.game_room import GameRoom, Player
+from app.schemas import GameState, PlayedCard, PlayerInfo, WebSocketMessage
 
 class GameMapper:
     @staticmethod
-    def to_game_room(db_room: GameRoomDB) -> GameRoom:
-        game_room = GameRoom(room_code=db_room.room_code)
-        game_room.is_game_started = db_room.is_game_started
-        game_room.current_turn = db_room.current_turn
-        
-        # Map players
+    def to_game_room(
+        db_room: GameRoomDB,
+        snapshot: Optional[GameSnapshotDB] = None,
+        events: Iterable[GameEventDB] = (),
+    ) -> GameRoom:
+        """Rebuild a room from its latest snapshot plus the events logged after it.
+
+        Without a snapshot, replay starts from the state columns on the room and
+        player rows, which is all that rooms created before the log had.
+        """
+        if snapshot is not None:
+            game_room = GameRoom.from_snapshot(db_room.room_code, snapshot.state, db_id=db_room.id)
+        else:
+            game_room = GameRoom(room_code=db_room.room_code, db_id=db_room.id)
+            game_room.is_game_started = db_room.is_game_started
+            game_room.current_turn = db_room.current_turn
+
+        for db_event in events:
+            game_room.apply(GameEvent(db_event.version, db_event.type, db_event.data, db_event.private))
+
+        # Map players whose join was not logged before the last flush
         for db_player in db_room.players:
-            player = GameMapper.to_player(db_player)
-            game_room.players[player.id] = player
+            if db_player.player_id not in game_room.players:
+                player = GameMapper.to_player(db_player)
+                game_room.players[player.id] = player
             
         return game_room
 
@@ -19,4 +40,87 @@ class GameMapper:
     def to_player(db_player: PlayerDB) -> Player:
         player = Player(player_id=db_player.player_id, name=db_player.name)
         player.is_ready = db_player.is_ready
-        return player
\ No newline at end of file
+        player.hand = Hand(db_player.hand_mask or 0)
+        return player
+
+    @staticmethod
+    def to_room_state(game_room: GameRoom) -> Dict[str, Any]:
+        """Row values for GameRoomDAO.update_room_states"""
+        return {
+            "room_code": game_room.room_code,
+            "is_game_started": game_room.is_game_started,
+            "current_turn": game_room.current_turn,
+            "status": game_room.status,
+            # Rooms are only written after something changed, so the flush time is the activity time
+            "last_activity_at": datetime.utcnow(),
+        }
+
+    @staticmethod
+    def to_player_states(game_room: GameRoom) -> List[Dict[str, Any]]:
+        """Row values for PlayerDAO.update_player_states"""
+        return [
+            {"player_id": player.id, "is_ready": player.is_ready, "hand_mask": player.hand.mask}
+            for player in game_room.players.values()
+        ]
+
+    @staticmethod
+    def to_event_rows(game_room: GameRoom, events: Iterable[GameEvent]) -> List[Dict[str, Any]]:
+        """Row values for GameEventDAO.append_events"""
+        return [
+            {
+                "game_room_id": game_room.db_id,
+                "version": event.version,
+                "type": event.type,
+                "data": event.data,
+                "private": event.private,
+            }
+            for event in events
+        ]
+
+    @staticmethod
+    def to_snapshot_row(game_room: GameRoom) -> Dict[str, Any]:
+        """Row values for GameEventDAO.save_snapshots"""
+        return {"game_room_id": game_room.db_id, "version": game_room.version, "state": game_room.snapshot()}
+
+    @staticmethod
+    def to_card_dict(card: Card) -> Dict[str, Union[str, int]]:
+        return {"suit": card.suit.value, "value": card.value, "name": card.name}
+
+    @staticmethod
+    def to_game_state(game_room: GameRoom, player_id: Optional[str] = None) -> GameState:
+        players: List[PlayerInfo] = [
+            PlayerInfo(
+                id=player.id,
+                name=player.name,
+                is_ready=player.is_ready,
+                card_count=len(player.hand)
+            )
+            for player in game_room.players.values()
+        ]
+        hand = None
+        if player_id in game_room.players:
+            hand = [GameMapper.to_card_dict(card) for card in game_room.players[player_id].hand]
+        game_round = game_room.round
+        return GameState(
+            players=players,
+            current_turn=game_room.current_turn,
+            is_game_started=game_room.is_game_started,
+            hand=hand,
+            version=game_room.version,
+            bids=dict(game_round.bids) if game_round else {},
+            trick=[
+                PlayedCard(player_id=played_by, card=card.index)
+                for played_by, card in game_round.trick
+            ] if game_round else [],
+            spades_broken=game_round.spades_broken if game_round else False,
+            scores=list(game_room.scores),
+            bags=list(game_room.bags)
+        )
+
+    @staticmethod
+    def to_hand_message(version: int, mask: int) -> WebSocketMessage:
+        """Private message carrying a player's hand as card indices"""
+        return WebSocketMessage(
+            type="hand",
+            data={"version": version, "cards": [card.index for card in Hand(mask)]}
+        )
@@ -0,0 +1,178 @@
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Buckets in seconds, from a cache hit to a slow database round trip
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "spades_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERY_DURATION = Histogram(
+    "spades_db_query_duration_seconds",
+    "SQL statement execution time",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "spades_db_queries_per_request",
+    "SQL statements executed while serving one HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+
+# Statements run by the current request, or None outside a request
+request_queries: ContextVar[Optional[List[Any]]] = ContextVar("request_queries", default=None)
+
+
+def statement_operation(statement: str) -> str:
+    """The SQL verb of a statement, used as a low-cardinality label"""
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+
+
+def observe_query(statement: str, seconds: float) -> None:
+    """Record one executed statement, called from the engine hooks in app.database"""
+    DB_QUERY_DURATION.labels(statement_operation(statement)).observe(seconds)
+    queries = request_queries.get()
+    if queries is not None:
+        queries.append((statement, seconds))
+
+
+class PoolCollector:
+    """Connection pool gauges, read from the engines when scraped"""
+
+    def __init__(self, engines: Dict[str, Any]):
+        self.engines = engines
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        checked_out = GaugeMetricFamily(
+            "spades_db_pool_checked_out", "Connections currently checked out of the pool", labels=["engine"]
+        )
+        overflow = GaugeMetricFamily(
+            "spades_db_pool_overflow", "Connections open beyond the configured pool size", labels=["engine"]
+        )
+        size = GaugeMetricFamily("spades_db_pool_size", "Configured pool size", labels=["engine"])
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            # Pools without a fixed size (such as SQLite's) do not report these
+            if hasattr(pool, "checkedout"):
+                checked_out.add_metric([name], pool.checkedout())
+            if hasattr(pool, "overflow"):
+                overflow.add_metric([name], max(pool.overflow(), 0))
+            if hasattr(pool, "size"):
+                size.add_metric([name], pool.size())
+        yield checked_out
+        yield overflow
+        yield size
+
+
+class GameCollector:
+    """Game-level gauges and counters, read from the game service when scraped.
+
+    The service keeps plain integer counters, so the hot paths pay nothing
+    for being measured.
+    """
+
+    def __init__(self, get_service: Callable[[], Any]):
+        self.get_service = get_service
+
+    def collect(self) -> Iterable[Any]:
+        service = self.get_service()
+        if service is None:
+            return
+        cache = service.active_games.stats()
+        hub = service.hub
+        yield GaugeMetricFamily("spades_active_games", "Rooms held in memory", value=cache["size"])
+        yield GaugeMetricFamily("spades_open_rooms", "Rooms waiting for players", value=len(service.directory))
+        yield GaugeMetricFamily("spades_websocket_connections", "Open WebSocket connections", value=hub.connection_count)
+        yield GaugeMetricFamily(
+            "spades_persist_dirty_rooms", "Rooms waiting for the next write-behind flush", value=service.persister.dirty_count
+        )
+        yield CounterMetricFamily(
+            "spades_websocket_messages_sent", "WebSocket messages queued to clients", value=hub.messages_sent
+        )
+        yield CounterMetricFamily(
+            "spades_websocket_messages_received", "WebSocket commands received from clients", value=service.messages_received
+        )
+        yield CounterMetricFamily(
+            "spades_websocket_slow_disconnects", "Clients disconnected for falling behind", value=hub.slow_disconnects
+        )
+        rooms = CounterMetricFamily("spades_room_cache", "Room cache lookups and evictions", labels=["result"])
+        for result in ("hits", "misses", "evictions"):
+            rooms.add_metric([result], cache[result])
+        yield rooms
+        yield CounterMetricFamily(
+            "spades_persist_rows_written", "Rows written by write-behind flushes", value=service.persister.rows_written
+        )
+        yield CounterMetricFamily(
+            "spades_persist_rooms_dropped",
+            "Rooms whose unwritable changes were dropped after repeated flush failures",
+            value=service.persister.rooms_dropped,
+        )
+
+
+class AdmissionCollector:
+    """Admission control counters, read when scraped"""
+
+    def __init__(self, admission: Any):
+        self.admission = admission
+
+    def collect(self) -> Iterable[Any]:
+        stats = self.admission.stats()
+        yield GaugeMetricFamily("spades_admission_in_flight", "Admitted requests still running", value=stats["in_flight"])
+        rejected = CounterMetricFamily("spades_admission_rejected", "Requests shed by admission control", labels=["reason"])
+        rejected.add_metric(["rate_limited"], stats["rate_limited"])
+        rejected.add_metric(["overloaded"], stats["overloaded"])
+        yield rejected
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request and counting its SQL statements, by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        queries: List[Any] = []
+        token = request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the scope
+            route = scope.get("route")
+            path = route.path if route else "unmatched"
+            HTTP_REQUEST_DURATION.labels(scope["method"], path, str(status)).observe(time.perf_counter() - start)
+            DB_QUERIES_PER_REQUEST.labels(path).observe(len(queries))
+            request_queries.reset(token)
+
+
+def register_collectors(engines: Dict[str, Any], get_service: Callable[[], Any], admission: Any) -> None:
+    """Add the scrape-time pool, game and admission collectors to the default registry"""
+    REGISTRY.register(PoolCollector(engines))
+    REGISTRY.register(GameCollector(get_service))
+    REGISTRY.register(AdmissionCollector(admission))
+
+
+def render() -> bytes:
+    return generate_latest(REGISTRY)
+
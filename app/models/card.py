@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 import random
 
 class Suit(Enum):
@@ -8,11 +8,52 @@ class Suit(Enum):
     CLUBS = "clubs"
     SPADES = "spades"
 
+SUITS: Tuple[Suit, ...] = tuple(Suit)
+SUIT_INDEX = {suit: index for index, suit in enumerate(SUITS)}
+CARDS_PER_SUIT = 13
+DECK_SIZE = CARDS_PER_SUIT * len(SUITS)
+
+# Bit layout: card index = suit index * 13 + (value - 1), so each suit owns a
+# contiguous run of 13 bits in a hand mask.
+SUIT_MASKS: Tuple[int, ...] = tuple(
+    ((1 << CARDS_PER_SUIT) - 1) << (CARDS_PER_SUIT * index) for index in range(len(SUITS))
+)
+FULL_MASK = (1 << DECK_SIZE) - 1
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count
+else:  # Python < 3.10
+    def _popcount(mask: int) -> int:
+        return bin(mask).count("1")
+
+
+def card_index(suit: Suit, value: int) -> int:
+    """Return the 0-51 index of a card."""
+    return SUIT_INDEX[suit] * CARDS_PER_SUIT + value - 1
+
+
 class Card:
-    def __init__(self, suit: Suit, value: int):
-        self.suit = suit
-        self.value = value  # 1-13 (Ace through King)
-    
+    """A playing card.
+
+    Cards are interned: ``Card(suit, value)`` always returns the same shared
+    instance, so creating or comparing cards never allocates.
+    """
+    __slots__ = ("suit", "value", "index")
+
+    def __new__(cls, suit: Suit, value: int) -> "Card":
+        if not 1 <= value <= CARDS_PER_SUIT:
+            raise ValueError(f"Invalid card value: {value}")
+        return _CARDS[card_index(suit, value)]
+
+    @classmethod
+    def from_index(cls, index: int) -> "Card":
+        """Return the interned card for a 0-51 index."""
+        return _CARDS[index]
+
+    @property
+    def bit(self) -> int:
+        return 1 << self.index
+
     @property
     def name(self) -> str:
         if self.value == 1:
@@ -24,32 +65,127 @@ class Card:
         elif self.value == 13:
             return "King"
         return str(self.value)
-    
+
     def __str__(self) -> str:
         return f"{self.name} of {self.suit.value}"
 
+    def __repr__(self) -> str:
+        return f"Card({self.suit.name}, {self.value})"
+
+    def __reduce__(self):
+        return (Card.from_index, (self.index,))
+
+
+def _build_cards() -> Tuple[Card, ...]:
+    cards = []
+    for suit in SUITS:
+        for value in range(1, CARDS_PER_SUIT + 1):
+            card = object.__new__(Card)
+            card.suit = suit
+            card.value = value
+            card.index = card_index(suit, value)
+            cards.append(card)
+    return tuple(cards)
+
+
+_CARDS: Tuple[Card, ...] = _build_cards()
+
+
+class Hand:
+    """A set of cards stored as a 52-bit mask (bit ``n`` set means card ``n`` is held)."""
+    __slots__ = ("mask",)
+
+    def __init__(self, mask: int = 0):
+        self.mask = mask
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[Card]) -> "Hand":
+        mask = 0
+        for card in cards:
+            mask |= 1 << card.index
+        return cls(mask)
+
+    def add(self, card: Card) -> None:
+        self.mask |= 1 << card.index
+
+    def remove(self, card: Card) -> None:
+        """Remove a card, raising ``ValueError`` if it is not in the hand."""
+        bit = 1 << card.index
+        if not self.mask & bit:
+            raise ValueError(f"{card} is not in hand")
+        self.mask ^= bit
+
+    def clear(self) -> None:
+        self.mask = 0
+
+    def suit_mask(self, suit: Suit) -> int:
+        """Return the bits of this hand that belong to ``suit``."""
+        return self.mask & SUIT_MASKS[SUIT_INDEX[suit]]
+
+    def has_suit(self, suit: Suit) -> bool:
+        return bool(self.mask & SUIT_MASKS[SUIT_INDEX[suit]])
+
+    def count_suit(self, suit: Suit) -> int:
+        return _popcount(self.mask & SUIT_MASKS[SUIT_INDEX[suit]])
+
+    def __contains__(self, card: Card) -> bool:
+        return bool(self.mask >> card.index & 1)
+
+    def __len__(self) -> int:
+        return _popcount(self.mask)
+
+    def __bool__(self) -> bool:
+        return bool(self.mask)
+
+    def __iter__(self) -> Iterator[Card]:
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            yield _CARDS[low.bit_length() - 1]
+            mask ^= low
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Hand):
+            return self.mask == other.mask
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Hand({self.mask:#x})"
+
+
 class Deck:
     def __init__(self):
         self.cards: List[Card] = []
         self.reset()
-    
+
     def reset(self) -> None:
         """Reset the deck to a full 52-card deck."""
-        self.cards = []
-        for suit in Suit:
-            for value in range(1, 14):
-                self.cards.append(Card(suit, value))
-    
+        self.cards = list(_CARDS)
+
     def shuffle(self) -> None:
         """Shuffle the deck."""
         random.shuffle(self.cards)
-    
+
     def draw(self) -> Optional[Card]:
         """Draw a card from the deck."""
         if not self.cards:
             return None
         return self.cards.pop()
-    
+
+    def draw_many(self, count: int) -> List[Card]:
+        """Draw up to ``count`` cards, in the order repeated ``draw()`` calls would return them."""
+        count = min(count, len(self.cards))
+        if count <= 0:
+            return []
+        drawn = self.cards[-count:]
+        del self.cards[-count:]
+        drawn.reverse()
+        return drawn
+
+    def discard(self, mask: int) -> None:
+        """Remove every card whose bit is set in ``mask`` from the deck."""
+        self.cards = [card for card in self.cards if not mask >> card.index & 1]
+
     def remaining_cards(self) -> int:
         """Return the number of remaining cards in the deck."""
-        return len(self.cards) 
\ No newline at end of file
+        return len(self.cards)
@@ -1,19 +1,26 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKey, DateTime, Index, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
 class GameRoomDB(Base):
     __tablename__ = "game_rooms"
+    __table_args__ = (
+        # Warm start pages through playing rooms; archival scans finished and idle ones
+        Index("ix_game_rooms_status_id", "status", "id"),
+        Index("ix_game_rooms_status_last_activity_at", "status", "last_activity_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     room_code = Column(String, unique=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_game_started = Column(Boolean, default=False)
     current_turn = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="waiting", server_default="waiting")  # see app.models.game_room
+    last_activity_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    players = relationship("PlayerDB", back_populates="game_room")
+    players = relationship("PlayerDB", back_populates="game_room", order_by="PlayerDB.id")
 
 class PlayerDB(Base):
     __tablename__ = "players"
@@ -22,8 +29,71 @@ class PlayerDB(Base):
     player_id = Column(String, unique=True, index=True)
     name = Column(String)
     is_ready = Column(Boolean, default=False)
-    game_room_id = Column(Integer, ForeignKey("game_rooms.id"))
+    hand_mask = Column(BigInteger, default=0)  # 52-bit mask, see app.models.card.Hand
+    game_room_id = Column(Integer, ForeignKey("game_rooms.id"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    game_room = relationship("GameRoomDB", back_populates="players") 
\ No newline at end of file
+    game_room = relationship("GameRoomDB", back_populates="players")
+
+class GameEventDB(Base):
+    """Append-only log of everything that happened in a room, see app.models.events"""
+    __tablename__ = "game_events"
+    __table_args__ = (UniqueConstraint("game_room_id", "version", name="uq_game_events_room_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_room_id = Column(Integer, ForeignKey("game_rooms.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    type = Column(String, nullable=False)
+    data = Column(JSON, nullable=False)
+    private = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class GameSnapshotDB(Base):
+    """Full room state as of ``version``; recovery replays only the events after it"""
+    __tablename__ = "game_snapshots"
+    __table_args__ = (UniqueConstraint("game_room_id", "version", name="uq_game_snapshots_room_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_room_id = Column(Integer, ForeignKey("game_rooms.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    state = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class GameRoomArchiveDB(Base):
+    """Finished and abandoned rooms moved out of game_rooms by app.services.archiver"""
+    __tablename__ = "game_rooms_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    room_code = Column(String, index=True)
+    created_at = Column(DateTime)
+    is_game_started = Column(Boolean)
+    current_turn = Column(String, nullable=True)
+    status = Column(String)
+    last_activity_at = Column(DateTime)
+    archived_at = Column(DateTime, index=True)
+
+class PlayerArchiveDB(Base):
+    __tablename__ = "players_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    player_id = Column(String, index=True)
+    name = Column(String)
+    is_ready = Column(Boolean)
+    hand_mask = Column(BigInteger)
+    game_room_id = Column(Integer, index=True)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime)
+
+class GameEventArchiveDB(Base):
+    __tablename__ = "game_events_archive"
+    __table_args__ = (Index("ix_game_events_archive_room_version", "game_room_id", "version"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    game_room_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    type = Column(String, nullable=False)
+    data = Column(JSON, nullable=False)
+    private = Column(JSON, nullable=True)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime)
@@ -0,0 +1,38 @@
+from typing import List, Optional
+import numpy as np
+from .card import DECK_SIZE
+from .game_room import CARDS_PER_PLAYER
+
+
+def make_rng(seed: Optional[int] = None) -> np.random.Generator:
+    """Create the generator used for batch shuffles."""
+    return np.random.default_rng(seed)
+
+
+def shuffle_batch(n_rooms: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Return an ``(n_rooms, 52)`` matrix whose rows are independent deck permutations."""
+    rng = rng if rng is not None else make_rng()
+    decks = np.tile(np.arange(DECK_SIZE, dtype=np.uint8), (n_rooms, 1))
+    return rng.permuted(decks, axis=1)
+
+
+def deal_batch(
+    n_rooms: int,
+    n_players: int = 4,
+    rng: Optional[np.random.Generator] = None,
+) -> List[List[int]]:
+    """Shuffle and deal ``n_rooms`` tables in one vectorized pass.
+
+    Returns one list of hand masks per room, in seat order, ready to pass to
+    ``GameRoom.start_game(hands=...)``.
+    """
+    if n_rooms <= 0:
+        return []
+    dealt = min(CARDS_PER_PLAYER * n_players, DECK_SIZE) // n_players * n_players
+    permutations = shuffle_batch(n_rooms, rng)[:, :dealt]
+    # Round-robin deal: card k goes to seat k % n_players.
+    seats = permutations.reshape(n_rooms, -1, n_players).astype(np.uint64)
+    bits = np.left_shift(np.uint64(1), seats)
+    masks = np.bitwise_or.reduce(bits, axis=1)
+    return masks.tolist()
+
@@ -0,0 +1,26 @@
+from typing import Any, Dict, Optional
+
+# Number of recent events a room keeps for clients catching up by version
+EVENT_HISTORY = 256
+
+
+class GameEvent:
+    """One versioned change to a room.
+
+    ``data`` is safe to send to every player; ``private`` holds per-player
+    details (such as dealt hands) that must only reach their owner.
+    """
+    __slots__ = ("version", "type", "data", "private")
+
+    def __init__(self, version: int, type: str, data: Dict[str, Any], private: Optional[Dict[str, Any]] = None):
+        self.version = version
+        self.type = type
+        self.data = data
+        self.private = private
+
+    def public(self) -> Dict[str, Any]:
+        """Return the compact delta sent over the wire."""
+        return {"v": self.version, "type": self.type, "data": self.data}
+
+    def __repr__(self) -> str:
+        return f"GameEvent({self.version}, {self.type!r}, {self.data!r})"
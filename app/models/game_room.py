@@ -1,19 +1,33 @@
-from typing import Dict, List, Optional
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional, Sequence
 import random
 import string
 from datetime import datetime
-from .card import Deck, Card
+from .card import Deck, Card, Hand
+from .events import GameEvent, EVENT_HISTORY
+from .rules import IllegalMoveError, SpadesRound, Phase, teams_for, BAG_LIMIT, BAG_PENALTY, WINNING_SCORE
+
+CARDS_PER_PLAYER = 13  # Standard for most card games
+
+# Room lifecycle, stored in game_rooms.status
+ROOM_WAITING = "waiting"
+ROOM_PLAYING = "playing"
+ROOM_FINISHED = "finished"
+
+class RoomFullError(IllegalMoveError):
+    """Raised when joining a room that has no free seat."""
 
 class Player:
     def __init__(self, player_id: str, name: str):
         self.id = player_id
         self.name = name
-        self.hand: List[Card] = []
+        self.hand = Hand()
         self.is_ready = False
         self.last_active = datetime.now()
 
     def add_card(self, card: Card) -> None:
-        self.hand.append(card)
+        self.hand.add(card)
 
     def remove_card(self, card: Card) -> None:
         self.hand.remove(card)
@@ -22,56 +36,278 @@ class Player:
         self.last_active = datetime.now()
 
 class GameRoom:
-    def __init__(self, room_code: str, max_players: int = 4):
+    def __init__(self, room_code: str, max_players: int = 4, db_id: Optional[int] = None):
         self.room_code = room_code
+        self.db_id = db_id
         self.max_players = max_players
         self.players: Dict[str, Player] = {}
         self.deck = Deck()
         self.is_game_started = False
         self.current_turn: Optional[str] = None
         self.created_at = datetime.now()
+        self.round: Optional[SpadesRound] = None
+        self.rounds_played = 0
+        self.scores: List[int] = []
+        self.bags: List[int] = []
+        self.winning_team: Optional[int] = None
+        self.version = 0
+        self.events: Deque[GameEvent] = deque(maxlen=EVENT_HISTORY)
+
+    def _record(self, type: str, data: Dict[str, Any], private: Optional[Dict[str, Any]] = None) -> GameEvent:
+        """Bump the room version and remember the change for delta sync."""
+        self.version += 1
+        event = GameEvent(self.version, type, data, private)
+        self.events.append(event)
+        return event
+
+    def _set_turn(self, player_id: Optional[str]) -> None:
+        if player_id != self.current_turn:
+            self.current_turn = player_id
+            self._record("turn_changed", {"player_id": player_id})
+
+    def events_since(self, version: int) -> Optional[List[GameEvent]]:
+        """Return the events after ``version``, or None if they are no longer retained."""
+        if version == self.version:
+            return []
+        if version > self.version or not self.events or version < self.events[0].version - 1:
+            return None
+        return list(islice(self.events, version - self.events[0].version + 1, None))
 
     @classmethod
     def generate_room_code(cls, length: int = 6) -> str:
         """Generate a random room code."""
         return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
+    @property
+    def free_seats(self) -> int:
+        return self.max_players - len(self.players)
+
+    @property
+    def status(self) -> str:
+        if self.winning_team is not None:
+            return ROOM_FINISHED
+        return ROOM_PLAYING if self.is_game_started else ROOM_WAITING
+
+    def check_can_join(self) -> None:
+        """Raise ``IllegalMoveError`` (``RoomFullError`` when full) if no one can join now."""
+        if self.is_game_started:
+            raise IllegalMoveError("Game has already started")
+        if self.free_seats <= 0:
+            raise RoomFullError(f"Room {self.room_code} is full")
+
     def add_player(self, player_id: str, name: str) -> bool:
-        """Add a player to the game room."""
-        if len(self.players) >= self.max_players:
-            return False
+        """Add a player to the game room. Returns False if they are already in it.
+
+        Raises ``IllegalMoveError`` if the room is full or already playing.
+        """
         if player_id in self.players:
             return False
+        self.check_can_join()
         self.players[player_id] = Player(player_id, name)
+        self._record("player_joined", {"player_id": player_id, "name": name})
         return True
 
     def remove_player(self, player_id: str) -> None:
         """Remove a player from the game room."""
         if player_id in self.players:
             del self.players[player_id]
+            self._record("player_left", {"player_id": player_id})
+
+    def set_ready(self, player_id: str, is_ready: bool = True) -> bool:
+        """Mark a player ready (or not) to start."""
+        player = self.players.get(player_id)
+        if not player or self.is_game_started:
+            return False
+        if player.is_ready != is_ready:
+            player.is_ready = is_ready
+            self._record("player_ready", {"player_id": player_id, "is_ready": is_ready})
+        return True
 
-    def start_game(self) -> bool:
-        """Start the game if all players are ready."""
+    def start_game(self, hands: Optional[Sequence[int]] = None) -> bool:
+        """Start the game if all players are ready.
+
+        ``hands`` optionally supplies pre-dealt hand masks in seat order (see
+        ``app.models.dealer.deal_batch``); otherwise the room deals its own deck.
+        """
+        if self.is_game_started:
+            return False
         if len(self.players) < 2:  # Minimum 2 players required
             return False
         if not all(player.is_ready for player in self.players.values()):
             return False
         
         self.is_game_started = True
-        self.deck.reset()
-        self.deck.shuffle()
-        self.deal_cards()
-        self.current_turn = next(iter(self.players.keys()))
+        teams = teams_for(list(self.players))
+        self.scores = [0] * len(teams)
+        self.bags = [0] * len(teams)
+        self.rounds_played = 0
+        self.winning_team = None
+        self._record("game_started", {"seats": list(self.players)})
+        self.start_round(hands)
         return True
 
+    def start_round(self, hands: Optional[Sequence[int]] = None) -> None:
+        """Shuffle, deal and open bidding for the next round."""
+        self.deck.reset()
+        if hands is None:
+            self.deck.shuffle()
+            self.deal_cards()
+        else:
+            self._deal_masks(hands)
+        self._open_round()
+        self._record(
+            "round_started",
+            {"round": self.rounds_played},
+            private={"hands": {player_id: player.hand.mask for player_id, player in self.players.items()}},
+        )
+        self._set_turn(self.round.current_player)
+
+    def _deal_masks(self, hands: Sequence[int]) -> None:
+        dealt = 0
+        for player, mask in zip(self.players.values(), hands):
+            player.hand = Hand(mask)
+            dealt |= mask
+        self.deck.discard(dealt)
+
+    def _open_round(self) -> None:
+        self.round = SpadesRound(
+            seats=list(self.players),
+            hands={player_id: player.hand for player_id, player in self.players.items()},
+            leader=self.rounds_played,
+        )
+
+    def place_bid(self, player_id: str, bid: int) -> None:
+        """Place a bid for the current round. Raises ``IllegalMoveError`` if not allowed."""
+        if not self.round:
+            raise IllegalMoveError("Game has not started")
+        self.round.place_bid(player_id, bid)
+        self._record("bid_placed", {"player_id": player_id, "bid": bid})
+        self._set_turn(self.round.current_player)
+
+    def play_card(self, player_id: str, card: Card) -> Optional[str]:
+        """Play a card for the current round. Returns the trick winner when a trick completes."""
+        if not self.round:
+            raise IllegalMoveError("Game has not started")
+        winner = self.round.play_card(player_id, card)
+        self._record("card_played", {"player_id": player_id, "card": card.index})
+        if winner is not None:
+            self._record("trick_won", {"player_id": winner})
+        if self.round.phase == Phase.COMPLETE:
+            self._finish_round()
+        else:
+            self._set_turn(self.round.current_player)
+        return winner
+
+    def _finish_round(self) -> None:
+        for team, (points, bags) in enumerate(self.round.score()):
+            self.scores[team] += points
+            self.bags[team] += bags
+            if self.bags[team] >= BAG_LIMIT:
+                self.bags[team] -= BAG_LIMIT
+                self.scores[team] -= BAG_PENALTY
+        self.rounds_played += 1
+        self._record("round_scored", {"scores": list(self.scores), "bags": list(self.bags)})
+
+        leader = max(range(len(self.scores)), key=self.scores.__getitem__)
+        if self.scores[leader] >= WINNING_SCORE and self.scores.count(self.scores[leader]) == 1:
+            self.winning_team = leader
+            self._record("game_over", {"winning_team": leader})
+            self._set_turn(None)
+        else:
+            self.start_round()
+
+    def apply(self, event: GameEvent) -> None:
+        """Replay a recorded event onto this room without recording it again.
+
+        Events must be applied in version order, starting from an empty room or
+        from the ``snapshot`` taken just before the first of them.
+        """
+        data = event.data
+        if event.type == "player_joined":
+            self.players[data["player_id"]] = Player(data["player_id"], data["name"])
+        elif event.type == "player_left":
+            self.players.pop(data["player_id"], None)
+        elif event.type == "player_ready":
+            self.players[data["player_id"]].is_ready = data["is_ready"]
+        elif event.type == "game_started":
+            self.is_game_started = True
+            teams = teams_for(list(self.players))
+            self.scores = [0] * len(teams)
+            self.bags = [0] * len(teams)
+            self.rounds_played = 0
+            self.winning_team = None
+        elif event.type == "round_started":
+            hands = event.private["hands"]
+            self.rounds_played = data["round"]
+            self.deck.reset()
+            self._deal_masks([hands.get(player_id, 0) for player_id in self.players])
+            self._open_round()
+        elif event.type == "turn_changed":
+            self.current_turn = data["player_id"]
+        elif event.type == "bid_placed":
+            self.round.place_bid(data["player_id"], data["bid"])
+        elif event.type == "card_played":
+            # The round resolves the trick itself, so trick_won needs no replay
+            self.round.play_card(data["player_id"], Card.from_index(data["card"]))
+        elif event.type == "round_scored":
+            self.scores = list(data["scores"])
+            self.bags = list(data["bags"])
+            self.rounds_played += 1
+        elif event.type == "game_over":
+            self.winning_team = data["winning_team"]
+        self.version = event.version
+        self.events.append(event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the full room state, hands included, as JSON-serializable data."""
+        return {
+            "version": self.version,
+            "max_players": self.max_players,
+            "is_game_started": self.is_game_started,
+            "current_turn": self.current_turn,
+            "rounds_played": self.rounds_played,
+            "scores": list(self.scores),
+            "bags": list(self.bags),
+            "winning_team": self.winning_team,
+            "players": [
+                {"id": player.id, "name": player.name, "is_ready": player.is_ready, "hand": player.hand.mask}
+                for player in self.players.values()
+            ],
+            "round": self.round.to_state() if self.round else None,
+        }
+
+    @classmethod
+    def from_snapshot(cls, room_code: str, state: Dict[str, Any], db_id: Optional[int] = None) -> "GameRoom":
+        """Rebuild a room from ``snapshot`` data. Events after it can then be ``apply``-ed."""
+        game_room = cls(room_code, max_players=state["max_players"], db_id=db_id)
+        game_room.version = state["version"]
+        game_room.is_game_started = state["is_game_started"]
+        game_room.current_turn = state["current_turn"]
+        game_room.rounds_played = state["rounds_played"]
+        game_room.scores = list(state["scores"])
+        game_room.bags = list(state["bags"])
+        game_room.winning_team = state["winning_team"]
+        for saved in state["players"]:
+            player = Player(saved["id"], saved["name"])
+            player.is_ready = saved["is_ready"]
+            player.hand = Hand(saved["hand"])
+            game_room.players[player.id] = player
+        if state["round"]:
+            game_room.round = SpadesRound.from_state(
+                state["round"],
+                {player_id: player.hand for player_id, player in game_room.players.items()},
+            )
+        return game_room
+
     def deal_cards(self) -> None:
         """Deal cards to all players."""
-        cards_per_player = 13  # Standard for most card games
-        for _ in range(cards_per_player):
-            for player in self.players.values():
-                card = self.deck.draw()
-                if card:
-                    player.add_card(card)
+        players = list(self.players.values())
+        if not players:
+            return
+        # Round-robin deal: seat i receives every n-th card drawn.
+        dealt = self.deck.draw_many(CARDS_PER_PLAYER * len(players))
+        for seat, player in enumerate(players):
+            player.hand = Hand.from_cards(dealt[seat::len(players)])
 
     def next_turn(self) -> None:
         """Move to the next player's turn."""
@@ -81,14 +317,18 @@ class GameRoom:
         
         current_index = player_ids.index(self.current_turn)
         next_index = (current_index + 1) % len(player_ids)
-        self.current_turn = player_ids[next_index]
+        self._set_turn(player_ids[next_index])
 
     def get_player_hand(self, player_id: str) -> List[Card]:
         """Get a player's hand."""
         if player_id in self.players:
-            return self.players[player_id].hand
+            return list(self.players[player_id].hand)
         return []
 
+    def last_activity(self) -> datetime:
+        """Return the most recent player activity, or the creation time for an empty room."""
+        return max((player.last_active for player in self.players.values()), default=self.created_at)
+
     def is_player_turn(self, player_id: str) -> bool:
         """Check if it's the player's turn."""
         return self.current_turn == player_id 
\ No newline at end of file
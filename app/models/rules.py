@@ -0,0 +1,222 @@
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .card import Card, Hand, Suit, SUITS, SUIT_INDEX, SUIT_MASKS, CARDS_PER_SUIT, DECK_SIZE
+
+SPADES = SUIT_INDEX[Suit.SPADES]
+SPADE_MASK = SUIT_MASKS[SPADES]
+NON_SPADE_MASK = ~SPADE_MASK & ((1 << DECK_SIZE) - 1)
+
+MAX_BID = 13
+NIL_BONUS = 100
+BAG_LIMIT = 10
+BAG_PENALTY = 100
+WINNING_SCORE = 500
+
+# Per-card lookup tables so trick resolution never decodes a card twice.
+CARD_SUIT: Tuple[int, ...] = tuple(index // CARDS_PER_SUIT for index in range(DECK_SIZE))
+CARD_RANK: Tuple[int, ...] = tuple(
+    14 if index % CARDS_PER_SUIT == 0 else index % CARDS_PER_SUIT + 1  # Ace high
+    for index in range(DECK_SIZE)
+)
+
+
+class IllegalMoveError(Exception):
+    """Raised when a bid or play breaks the rules."""
+
+
+class Phase(Enum):
+    BIDDING = "bidding"
+    PLAYING = "playing"
+    COMPLETE = "complete"
+
+
+def teams_for(seats: Sequence[str]) -> List[Tuple[str, ...]]:
+    """Partnerships sit opposite each other at a four-player table; otherwise everyone plays alone."""
+    if len(seats) == 4:
+        return [(seats[0], seats[2]), (seats[1], seats[3])]
+    return [(seat,) for seat in seats]
+
+
+class SpadesRound:
+    """One deal of Spades: bidding, trick play and scoring.
+
+    Every bid and play is validated and resolved in constant time. Hands are
+    held as masks, so follow-suit checks are a single AND against a suit mask,
+    and the winning card of the current trick is tracked as cards are played.
+    """
+
+    def __init__(self, seats: Sequence[str], hands: Dict[str, Hand], leader: int = 0):
+        self.seats: List[str] = list(seats)
+        self.seat_of: Dict[str, int] = {player_id: seat for seat, player_id in enumerate(self.seats)}
+        self.hands = hands
+        self.leader = leader % len(self.seats)
+        self.turn = self.leader
+        self.phase = Phase.BIDDING
+        self.bids: Dict[str, int] = {}
+        self.tricks_won: Dict[str, int] = {player_id: 0 for player_id in self.seats}
+        self.spades_broken = False
+        self.total_tricks = min(len(hands[player_id]) for player_id in self.seats)
+        self.tricks_played = 0
+        self.trick: List[Tuple[str, Card]] = []
+        self.last_trick_winner: Optional[str] = None
+        self._led_suit = -1
+        self._winning_seat = -1
+        self._winning_suit = -1
+        self._winning_rank = 0
+
+    @property
+    def current_player(self) -> Optional[str]:
+        if self.phase == Phase.COMPLETE:
+            return None
+        return self.seats[self.turn]
+
+    @property
+    def led_suit(self) -> Optional[Suit]:
+        if self._led_suit < 0:
+            return None
+        return SUITS[self._led_suit]
+
+    def _check_turn(self, player_id: str, phase: Phase) -> int:
+        if self.phase != phase:
+            raise IllegalMoveError(f"Not in {phase.value} phase")
+        seat = self.seat_of.get(player_id)
+        if seat is None:
+            raise IllegalMoveError("Player is not seated in this round")
+        if seat != self.turn:
+            raise IllegalMoveError("Not your turn")
+        return seat
+
+    def place_bid(self, player_id: str, bid: int) -> None:
+        """Record a bid (0 is nil) and advance the turn."""
+        self._check_turn(player_id, Phase.BIDDING)
+        if not 0 <= bid <= MAX_BID:
+            raise IllegalMoveError(f"Bid must be between 0 and {MAX_BID}")
+        self.bids[player_id] = bid
+        self.turn = (self.turn + 1) % len(self.seats)
+        if len(self.bids) == len(self.seats):
+            self.phase = Phase.PLAYING
+            self.turn = self.leader
+
+    def legal_mask(self, player_id: str) -> int:
+        """Return the mask of cards ``player_id`` may play on the current trick."""
+        hand = self.hands[player_id].mask
+        if not self.trick:
+            if not self.spades_broken and hand & NON_SPADE_MASK:
+                return hand & NON_SPADE_MASK
+            return hand
+        return hand & SUIT_MASKS[self._led_suit] or hand
+
+    def is_legal_play(self, player_id: str, card: Card) -> bool:
+        if self.phase != Phase.PLAYING or self.seat_of.get(player_id) != self.turn:
+            return False
+        return bool(self.legal_mask(player_id) >> card.index & 1)
+
+    def play_card(self, player_id: str, card: Card) -> Optional[str]:
+        """Play a card. Returns the trick winner when this card completes a trick."""
+        seat = self._check_turn(player_id, Phase.PLAYING)
+        if not self.legal_mask(player_id) >> card.index & 1:
+            if card not in self.hands[player_id]:
+                raise IllegalMoveError(f"{card} is not in your hand")
+            if self.trick:
+                raise IllegalMoveError("You must follow suit")
+            raise IllegalMoveError("Spades have not been broken")
+
+        self.hands[player_id].remove(card)
+        suit = CARD_SUIT[card.index]
+        rank = CARD_RANK[card.index]
+        if suit == SPADES:
+            self.spades_broken = True
+
+        if not self.trick:
+            self._led_suit = suit
+            self._take_lead(seat, suit, rank)
+        elif suit == self._winning_suit:
+            if rank > self._winning_rank:
+                self._take_lead(seat, suit, rank)
+        elif suit == SPADES:
+            self._take_lead(seat, suit, rank)
+        self.trick.append((player_id, card))
+
+        if len(self.trick) < len(self.seats):
+            self.turn = (seat + 1) % len(self.seats)
+            return None
+        return self._finish_trick()
+
+    def _take_lead(self, seat: int, suit: int, rank: int) -> None:
+        self._winning_seat = seat
+        self._winning_suit = suit
+        self._winning_rank = rank
+
+    def _finish_trick(self) -> str:
+        winner = self.seats[self._winning_seat]
+        self.tricks_won[winner] += 1
+        self.tricks_played += 1
+        self.last_trick_winner = winner
+        self.turn = self._winning_seat
+        self.trick = []
+        self._led_suit = -1
+        self._winning_seat = -1
+        self._winning_suit = -1
+        self._winning_rank = 0
+        if self.tricks_played >= self.total_tricks:
+            self.phase = Phase.COMPLETE
+        return winner
+
+    def to_state(self) -> Dict[str, Any]:
+        """Return the round as plain JSON-serializable data (hands are held by the players)."""
+        return {
+            "seats": list(self.seats),
+            "leader": self.leader,
+            "turn": self.turn,
+            "phase": self.phase.value,
+            "bids": dict(self.bids),
+            "tricks_won": dict(self.tricks_won),
+            "spades_broken": self.spades_broken,
+            "total_tricks": self.total_tricks,
+            "tricks_played": self.tricks_played,
+            "trick": [[player_id, card.index] for player_id, card in self.trick],
+            "last_trick_winner": self.last_trick_winner,
+            "winning": [self._led_suit, self._winning_seat, self._winning_suit, self._winning_rank],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], hands: Dict[str, Hand]) -> "SpadesRound":
+        """Rebuild a round saved with ``to_state`` around the players' current hands."""
+        game_round = cls(state["seats"], hands, state["leader"])
+        game_round.turn = state["turn"]
+        game_round.phase = Phase(state["phase"])
+        game_round.bids = dict(state["bids"])
+        game_round.tricks_won = dict(state["tricks_won"])
+        game_round.spades_broken = state["spades_broken"]
+        game_round.total_tricks = state["total_tricks"]
+        game_round.tricks_played = state["tricks_played"]
+        game_round.trick = [(player_id, Card.from_index(index)) for player_id, index in state["trick"]]
+        game_round.last_trick_winner = state["last_trick_winner"]
+        game_round._led_suit, game_round._winning_seat, game_round._winning_suit, game_round._winning_rank = state["winning"]
+        return game_round
+
+    def score(self) -> List[Tuple[int, int]]:
+        """Return ``(points, bags)`` for each team, in ``teams_for(seats)`` order."""
+        results = []
+        for team in teams_for(self.seats):
+            points = 0
+            bags = 0
+            contract = 0
+            taken = 0
+            for player_id in team:
+                bid = self.bids.get(player_id, 0)
+                won = self.tricks_won[player_id]
+                if bid == 0:
+                    points += NIL_BONUS if won == 0 else -NIL_BONUS
+                    bags += won
+                else:
+                    contract += bid
+                    taken += won
+            if contract:
+                if taken >= contract:
+                    points += 10 * contract + (taken - contract)
+                    bags += taken - contract
+                else:
+                    points -= 10 * contract
+            results.append((points, bags))
+        return results
@@ -0,0 +1,225 @@
+"""Opt-in per-request SQL profiling.
+
+With ``settings.profile_requests`` on, every statement an HTTP request or a
+WebSocket command runs is recorded with its duration and the app frame that
+issued it. Statements run ``profile_repeat_threshold`` times or more by one
+request are logged as likely N+1 patterns, and requests slower than
+``profile_slow_request_ms`` are logged with a per-statement breakdown.
+
+A request may send ``X-Profile: cprofile`` to also capture a cProfile of
+itself, and ``profile_sample_rate`` captures a random share of requests the
+same way. cProfile sees the whole event loop while it runs, so a capture
+includes whatever other requests were interleaved with this one.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import sys
+import time
+import greenlet
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(APP_DIR)
+# The instrumentation's own frames are never the call site
+SKIPPED_FILES = {os.path.join(APP_DIR, name) for name in ("database.py", "metrics.py", "profiler.py")}
+
+# The profile of the request being served, or None
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+# Only one cProfile can run per thread, so captures take turns
+_capturing = False
+
+
+def call_site() -> str:
+    """The innermost app frame that issued the current statement.
+
+    Async SQLAlchemy runs the driver in a greenlet whose stack ends at the
+    ``greenlet_spawn`` that started it, so the walk continues into the
+    parent greenlet to reach the DAO and service frames.
+    """
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(APP_DIR) and filename not in SKIPPED_FILES:
+                return f"{os.path.relpath(filename, ROOT_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return "unknown"
+        frame = current.gr_frame
+
+
+def shorten(statement: str, width: int = 160) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= width else statement[:width - 3] + "..."
+
+
+class RequestProfile:
+    """Statements run while serving one request or WebSocket command"""
+
+    def __init__(self, name: str, capture: bool = False):
+        self.name = name
+        self.queries: List[Tuple[str, float, str]] = []
+        self.started = time.perf_counter()
+        self.parked = 0.0
+        self.duration: Optional[float] = None
+        self.profiler = cProfile.Profile() if capture else None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries.append((statement, seconds, call_site()))
+
+    def finish(self) -> None:
+        # Time parked waiting for a room to change is not work done by the request
+        self.duration = time.perf_counter() - self.started - self.parked
+
+    @property
+    def query_time(self) -> float:
+        return sum(seconds for _, seconds, _ in self.queries)
+
+    def breakdown(self) -> List[Tuple[str, int, float, List[str]]]:
+        """(statement, count, total seconds, call sites) per distinct statement, slowest first"""
+        groups: Dict[str, list] = {}
+        for statement, seconds, site in self.queries:
+            group = groups.setdefault(statement, [0, 0.0, []])
+            group[0] += 1
+            group[1] += seconds
+            if site not in group[2]:
+                group[2].append(site)
+        return sorted(
+            ((statement, count, seconds, sites) for statement, (count, seconds, sites) in groups.items()),
+            key=lambda row: row[2],
+            reverse=True,
+        )
+
+    def repeated(self, threshold: int = settings.profile_repeat_threshold) -> List[Tuple[str, int, float, List[str]]]:
+        """Statements run at least ``threshold`` times, the usual sign of a query inside a loop"""
+        return [row for row in self.breakdown() if row[1] >= threshold]
+
+    def report(self, limit: int = 10) -> str:
+        lines = [
+            f"{self.name}: {self.duration * 1000:.1f} ms, {len(self.queries)} queries "
+            f"({self.query_time * 1000:.1f} ms in SQL)"
+        ]
+        for statement, count, seconds, sites in self.breakdown()[:limit]:
+            lines.append(f"  {count:>4}x {seconds * 1000:8.1f} ms  {shorten(statement)}  <- {', '.join(sites)}")
+        return "\n".join(lines)
+
+    def stats(self, limit: int = 25) -> str:
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+def record_query(statement: str, seconds: float) -> None:
+    """Add a statement to the current profile, called from the engine hooks in app.database"""
+    profile = current_profile.get()
+    # A room actor may outlive the command whose context it was started in
+    if profile is not None and profile.duration is None:
+        profile.record(statement, seconds)
+
+
+@contextmanager
+def parked() -> Iterator[None]:
+    """Exclude the enclosed wait (a long poll or an idle SSE stream) from the current request's duration"""
+    profile = current_profile.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.parked += time.perf_counter() - start
+
+
+@contextmanager
+def profiled(name: str, capture: bool = False) -> Iterator[Optional[RequestProfile]]:
+    """Profile the enclosed request or command, then log what it found. Yields None when profiling is off."""
+    global _capturing
+    if not settings.profile_requests:
+        yield None
+        return
+
+    capture = (capture or random.random() < settings.profile_sample_rate) and not _capturing
+    profile = RequestProfile(name, capture)
+    token = current_profile.set(profile)
+    if profile.profiler is not None:
+        _capturing = True
+        profile.profiler.enable()
+    try:
+        yield profile
+    finally:
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            _capturing = False
+        profile.finish()
+        current_profile.reset(token)
+        log_profile(profile)
+
+
+def log_profile(profile: RequestProfile) -> None:
+    for statement, count, seconds, sites in profile.repeated():
+        logger.warning(
+            f"Possible N+1 in {profile.name}: {count}x {shorten(statement)} "
+            f"({seconds * 1000:.1f} ms) from {', '.join(sites)}"
+        )
+    if profile.duration * 1000 >= settings.profile_slow_request_ms:
+        logger.warning(f"Slow request {profile.report()}")
+    if profile.profiler is not None:
+        logger.info(f"cProfile of {profile.name}:\n{profile.stats()}")
+
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling each HTTP request, named by its route template.
+
+    The profile's totals so far are returned in a ``Server-Timing`` header,
+    so they show up in browser dev tools.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        capture = dict(scope["headers"]).get(PROFILE_HEADER, b"").lower() == b"cprofile"
+        with profiled(f"{scope['method']} {scope['path']}", capture) as profile:
+
+            def name_by_route():
+                # The router records the matched route in the scope
+                route = scope.get("route")
+                if route is not None:
+                    profile.name = f"{scope['method']} {route.path}"
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    # Headers go out before a streamed body, so this covers the work up to them
+                    name_by_route()
+                    elapsed = time.perf_counter() - profile.started - profile.parked
+                    timing = (
+                        f'db;dur={profile.query_time * 1000:.1f};desc="{len(profile.queries)} queries", '
+                        f"app;dur={elapsed * 1000:.1f}"
+                    )
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+                await send(message)
+
+            if profile is None:
+                await self.app(scope, receive, send)
+                return
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                name_by_route()
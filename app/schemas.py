@@ -1,5 +1,5 @@
-from typing import Union, Dict, Optional, List
-from pydantic import BaseModel
+from typing import Annotated, Union, Dict, Optional, List
+from pydantic import BaseModel, Field
 
 class CreateRoomResponse(BaseModel):
     room_code: str
@@ -10,17 +10,46 @@ class JoinRoomRequest(BaseModel):
 class JoinRoomResponse(BaseModel):
     player_id: str
 
+class QuickJoinResponse(BaseModel):
+    room_code: str
+    player_id: str
+
+class ProvisionRoomsRequest(BaseModel):
+    # Names of the players to seat at each new room, at most four per room
+    tables: List[Annotated[List[str], Field(max_length=4)]] = Field(min_length=1)
+
+class SeatedPlayer(BaseModel):
+    player_name: str
+    player_id: str
+
+class ProvisionedRoom(BaseModel):
+    room_code: str
+    players: List[SeatedPlayer]
+
+class ProvisionRoomsResponse(BaseModel):
+    rooms: List[ProvisionedRoom]
+
 class PlayerInfo(BaseModel):
     id: str
     name: str
     is_ready: bool
     card_count: int
 
+class PlayedCard(BaseModel):
+    player_id: str
+    card: int
+
 class GameState(BaseModel):
     players: List[PlayerInfo]
     current_turn: Optional[str]
     is_game_started: bool
     hand: Optional[List[Dict[str, Union[str, int]]]]
+    version: int = 0
+    bids: Dict[str, int] = {}
+    trick: List[PlayedCard] = []
+    spades_broken: bool = False
+    scores: List[int] = []
+    bags: List[int] = []
 
 class WebSocketMessage(BaseModel):
     type: str
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+import math
+import time
+from app.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when new work is shed: 429 when a rate limit is spent, 503 when the worker is saturated"""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class TokenBucket:
+    """``burst`` tokens, refilled continuously at ``rate`` per second"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Spend a token. Returns 0 if one was available, otherwise the seconds until one will be."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """A token bucket per key, such as a client address or a room code.
+
+    At most ``max_keys`` buckets are kept, dropping the least recently used,
+    which would have refilled anyway after ``burst / rate`` idle seconds.
+    A ``rate`` of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = settings.admission_max_tracked_keys):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def take(self, key: str, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(now)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """Admission control for work that brings new load: creating, joining and connecting to rooms.
+
+    Each admission spends a token from the client's bucket and, when it
+    targets a room, from that room's bucket, so neither one client nor a
+    reconnect storm on one room can monopolise the worker. It also takes one
+    of ``max_in_flight`` slots, sized by default to the database pool, so
+    that excess arrivals are turned away at once instead of queueing for a
+    connection. Commands and polls from games already in progress are never
+    admitted here, so they keep their latency while newcomers are shed.
+    """
+
+    def __init__(
+        self,
+        client_rate: float = settings.admission_client_rate,
+        client_burst: int = settings.admission_client_burst,
+        room_rate: float = settings.admission_room_rate,
+        room_burst: int = settings.admission_room_burst,
+        max_in_flight: int = settings.admission_max_in_flight,
+        retry_after: float = settings.admission_retry_after,
+    ):
+        self.clients = RateLimiter(client_rate, client_burst)
+        self.rooms = RateLimiter(room_rate, room_burst)
+        self.max_in_flight = max_in_flight or settings.db_pool_size + settings.db_max_overflow
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+
+    def acquire(self, client: str, room_code: Optional[str] = None) -> None:
+        """Admit one unit of work or raise ``AdmissionRejected``. Every admission must be released."""
+        now = time.monotonic()
+        wait = self.clients.take(client, now)
+        if not wait and room_code is not None:
+            wait = self.rooms.take(room_code, now)
+        if wait:
+            self.rate_limited += 1
+            raise AdmissionRejected(429, wait, "Too many requests")
+        if self.in_flight >= self.max_in_flight:
+            self.overloaded += 1
+            raise AdmissionRejected(503, self.retry_after, "Server is busy")
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "overloaded": self.overloaded,
+        }
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+import asyncio
+import logging
+from app.config import settings
+from app.dao.unit_of_work import UnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+class RoomArchiver:
+    """Moves finished and abandoned rooms out of the hot tables.
+
+    Every ``interval`` seconds, rooms finished more than ``finished_after``
+    seconds ago and rooms of any status idle for more than ``idle_after``
+    seconds are copied, with their players and event logs, into the
+    ``*_archive`` tables and deleted. Each batch of ``batch_size`` rooms is
+    its own transaction, so locks stay short.
+
+    Each worker only archives the rooms it ``owns``, since only the owner
+    knows whether a room is live: rooms for which ``is_live`` is true are
+    left alone, however old their stored activity is, because this worker
+    still holds them in memory.
+    """
+
+    def __init__(
+        self,
+        is_live: Callable[[str], bool] = lambda room_code: False,
+        owns: Callable[[str], bool] = lambda room_code: True,
+        interval: float = settings.archive_interval,
+        finished_after: float = settings.archive_finished_after,
+        idle_after: float = settings.archive_idle_after,
+        batch_size: int = settings.archive_batch_size,
+        uow_factory: Callable[[], UnitOfWork] = UnitOfWork,
+    ):
+        self.is_live = is_live
+        self.owns = owns
+        self.interval = interval
+        self.finished_after = finished_after
+        self.idle_after = idle_after
+        self.batch_size = batch_size
+        self.uow_factory = uow_factory
+        self._task: Optional[asyncio.Task] = None
+        self.rooms_archived = 0
+
+    async def archive_batch(self, now: datetime, after_id: int = 0) -> Optional[int]:
+        """Archive the next batch of due rooms after ``after_id``. Returns the id to continue after, or None when done."""
+        async with self.uow_factory() as uow:
+            rows = await uow.archive.get_archivable_rooms(
+                finished_before=now - timedelta(seconds=self.finished_after),
+                idle_before=now - timedelta(seconds=self.idle_after),
+                after_id=after_id,
+                limit=self.batch_size,
+            )
+            room_ids = [room_id for room_id, room_code in rows if self.owns(room_code) and not self.is_live(room_code)]
+            await uow.archive.archive_rooms(room_ids, archived_at=now)
+        self.rooms_archived += len(room_ids)
+        return rows[-1][0] if len(rows) == self.batch_size else None
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Archive everything that is due, batch by batch. Returns the number of rooms archived."""
+        archived = self.rooms_archived
+        now = now or datetime.utcnow()
+        after_id = await self.archive_batch(now)
+        while after_id is not None:
+            # Let requests in between batches
+            await asyncio.sleep(0)
+            after_id = await self.archive_batch(now, after_id)
+        return self.rooms_archived - archived
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                archived = await self.run_once()
+                if archived:
+                    logger.info(f"Archived {archived} finished or idle rooms")
+            except Exception as e:
+                logger.error(f"Room archival failed: {e}")
+
+    def start(self) -> None:
+        """Start the periodic archival task, unless ``interval`` is 0."""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
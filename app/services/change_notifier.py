@@ -0,0 +1,41 @@
+from typing import Dict, List
+import asyncio
+
+
+class ChangeNotifier:
+    """Lets any number of requests wait for the next change to a room.
+
+    All waiters on a room share one ``asyncio.Event``, which is replaced on
+    every change, so a mutation costs a single ``set()`` however many
+    long-polls and event streams are parked on the room. A room's entry is
+    dropped when it is notified or when its last waiter gives up.
+    """
+
+    def __init__(self):
+        # Per room: the shared event and the number of requests waiting on it
+        self._events: Dict[str, List] = {}
+
+    async def wait(self, room_code: str, timeout: float) -> bool:
+        """Wait for the next ``notify`` of ``room_code``. Returns False on timeout."""
+        entry = self._events.get(room_code)
+        if entry is None:
+            entry = self._events[room_code] = [asyncio.Event(), 0]
+        entry[1] += 1
+        try:
+            await asyncio.wait_for(entry[0].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            entry[1] -= 1
+            if not entry[1] and self._events.get(room_code) is entry:
+                del self._events[room_code]
+
+    def notify(self, room_code: str) -> None:
+        """Wake everyone waiting on ``room_code``."""
+        entry = self._events.pop(room_code, None)
+        if entry is not None:
+            entry[0].set()
+
+    def __len__(self) -> int:
+        return len(self._events)
@@ -0,0 +1,72 @@
+from bisect import bisect
+from hashlib import blake2b
+from typing import Optional, Sequence
+import os
+import socket
+from app.config import settings
+from app.services.event_bus import EventBus, LocalEventBus, PostgresEventBus
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping room codes to nodes.
+
+    Each node is placed at ``replicas`` points on the ring, so adding or
+    removing a node only moves about 1/N of the rooms.
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 128):
+        self.nodes = list(nodes)
+        points = sorted((_hash(f"{node}#{replica}"), node) for node in self.nodes for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        index = bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class Cluster:
+    """This worker's view of the cluster: which rooms it owns and how to reach the others.
+
+    With no ``cluster_nodes`` configured the worker owns every room and no
+    bus is used.
+    """
+
+    def __init__(self, nodes: Sequence[str], node_url: str, bus: Optional[EventBus] = None):
+        if nodes and node_url not in nodes:
+            raise ValueError(f"node_url {node_url!r} is not one of cluster_nodes")
+        self.ring = HashRing(nodes)
+        self.node_url = node_url
+        self.node_id = node_url or f"{socket.gethostname()}:{os.getpid()}"
+        self.bus = bus
+        if bus is not None:
+            bus.node_id = self.node_id
+
+    @property
+    def is_clustered(self) -> bool:
+        return len(self.ring.nodes) > 1
+
+    def owner_of(self, room_code: str) -> Optional[str]:
+        return self.ring.node_for(room_code) if self.is_clustered else self.node_url
+
+    def owns(self, room_code: str) -> bool:
+        return not self.is_clustered or self.ring.node_for(room_code) == self.node_url
+
+
+def create_cluster() -> Cluster:
+    """Build the cluster described by settings"""
+    bus: Optional[EventBus] = None
+    if len(settings.cluster_nodes) > 1:
+        if settings.event_bus == "postgres":
+            bus = PostgresEventBus(settings.database_url, settings.event_bus_channel)
+        elif settings.event_bus == "local":
+            bus = LocalEventBus()
+        else:
+            raise ValueError(f"Unknown event bus: {settings.event_bus}")
+    return Cluster(settings.cluster_nodes, settings.node_url, bus)
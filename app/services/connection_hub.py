@@ -0,0 +1,245 @@
+from typing import Any, Dict, Iterator, Optional, Set, Union
+import asyncio
+import logging
+from fastapi.websockets import WebSocket
+from app.codec import JSON_CODEC, JsonCodec, MsgPackCodec
+from app.config import settings
+from app.schemas import WebSocketMessage
+from app.services.event_bus import EventBus
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients that fall too far behind (RFC 6455 "Try Again Later")
+CLOSE_SLOW_CONSUMER = 1013
+
+
+class Connection:
+    """A registered WebSocket with its own bounded send queue and sender task."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        room_code: str,
+        player_id: str,
+        queue_size: int,
+        codec: Union[JsonCodec, MsgPackCodec] = JSON_CODEC,
+    ):
+        self.websocket = websocket
+        self.codec = codec
+        self.room_code = room_code
+        self.player_id = player_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def enqueue(self, payload: Union[str, bytes]) -> bool:
+        """Queue a serialized message. Returns False if the queue is full."""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class ConnectionHub:
+    """Tracks WebSockets per room and fans messages out to them.
+
+    A broadcast serializes its message once per wire encoding in use and only
+    enqueues the payload for each recipient; a per-connection task does the
+    actual send. A client whose queue fills up is disconnected rather than
+    allowed to stall the room.
+
+    With an event ``bus``, events from other workers are delivered to the
+    sockets this worker holds. Messages for a room hosted here are only
+    published to the workers holding sockets for it (see ``attach_remote``):
+    a broadcast to each of them, and a message for one player, such as
+    their hand, only to the worker that player is connected to.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = settings.websocket_send_queue_size,
+        bus: Optional[EventBus] = None,
+        node_id: str = "",
+    ):
+        self.queue_size = queue_size
+        self.bus = bus
+        self.node_id = node_id
+        self.rooms: Dict[str, Dict[str, Connection]] = {}
+        # Per room, the node id of each player connected to another worker
+        self.remote: Dict[str, Dict[str, str]] = {}
+        # Closes of slow clients still running, held so they are not garbage collected
+        self._closing: Set[asyncio.Task] = set()
+        self.messages_sent = 0
+        self.slow_disconnects = 0
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        room_code: str,
+        player_id: str,
+        codec: Union[JsonCodec, MsgPackCodec] = JSON_CODEC,
+    ) -> Connection:
+        """Register an accepted WebSocket, replacing any older connection for the same player."""
+        connection = Connection(websocket, room_code, player_id, self.queue_size, codec)
+        previous = self.rooms.setdefault(room_code, {}).get(player_id)
+        self.rooms[room_code][player_id] = connection
+        if previous:
+            await self._close(previous, code=1000)
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        return connection
+
+    async def disconnect(self, connection: Connection, code: int = 1000) -> None:
+        """Unregister a connection and close its socket."""
+        self._unregister(connection)
+        await self._close(connection, code)
+
+    def broadcast(self, room_code: str, message: WebSocketMessage, exclude: Optional[str] = None) -> int:
+        """Send ``message`` to everyone in the room except ``exclude``. Returns the local recipient count."""
+        nodes = set(self.remote.get(room_code, {}).values())
+        if self.bus and nodes:
+            event = {
+                "kind": "broadcast",
+                "origin": self.node_id,
+                "room": room_code,
+                "exclude": exclude,
+                "message": message.model_dump(),
+            }
+            for node_id in nodes:
+                self.bus.publish(event, target=node_id)
+        return self._broadcast_local(room_code, message, exclude)
+
+    def _broadcast_local(self, room_code: str, message: WebSocketMessage, exclude: Optional[str] = None) -> int:
+        connections = self.rooms.get(room_code)
+        if not connections:
+            return 0
+        payloads = {}
+        sent = 0
+        for player_id, connection in list(connections.items()):
+            if player_id == exclude:
+                continue
+            payload = payloads.get(connection.codec)
+            if payload is None:
+                payload = payloads[connection.codec] = connection.codec.encode(message)
+            if self._deliver(connection, payload):
+                sent += 1
+        return sent
+
+    def send(self, room_code: str, player_id: str, message: WebSocketMessage) -> bool:
+        """Send ``message`` to one player. Returns False if they are not connected here."""
+        connection = self.rooms.get(room_code, {}).get(player_id)
+        if not connection:
+            node_id = self.remote.get(room_code, {}).get(player_id)
+            if self.bus and node_id:
+                self.bus.publish({
+                    "kind": "send",
+                    "origin": self.node_id,
+                    "room": room_code,
+                    "player": player_id,
+                    "message": message.model_dump(),
+                }, target=node_id)
+            return False
+        return self._deliver(connection, connection.codec.encode(message))
+
+    def attach_remote(self, room_code: str, player_id: str, node_id: str) -> None:
+        """Record that a player of a room hosted here is connected to worker ``node_id``."""
+        self.remote.setdefault(room_code, {})[player_id] = node_id
+
+    def detach_remote(self, room_code: str, player_id: str, node_id: str) -> None:
+        """Forget a remote player's socket, unless they have since connected to another worker."""
+        players = self.remote.get(room_code)
+        if players and players.get(player_id) == node_id:
+            del players[player_id]
+            if not players:
+                del self.remote[room_code]
+
+    async def on_bus_event(self, event: Dict[str, Any]) -> None:
+        """Deliver a broadcast or send published by another worker to local sockets."""
+        if event.get("origin") == self.node_id:
+            return
+        kind = event.get("kind")
+        if kind == "broadcast":
+            self._broadcast_local(event["room"], WebSocketMessage(**event["message"]), event.get("exclude"))
+        elif kind == "send":
+            connection = self.rooms.get(event["room"], {}).get(event["player"])
+            if connection:
+                self._deliver(connection, connection.codec.encode(WebSocketMessage(**event["message"])))
+        elif kind == "close":
+            connection = self.rooms.get(event["room"], {}).get(event["player"])
+            if connection:
+                await self.disconnect(connection, event.get("code", 1000))
+
+    async def close(self, room_code: str, player_id: str, code: int = 1000) -> None:
+        """Close a player's socket, wherever in the cluster it is connected."""
+        connection = self.rooms.get(room_code, {}).get(player_id)
+        if connection:
+            await self.disconnect(connection, code)
+        elif self.bus:
+            self.bus.publish({
+                "kind": "close",
+                "origin": self.node_id,
+                "room": room_code,
+                "player": player_id,
+                "code": code,
+            })
+
+    def is_connected(self, room_code: str, player_id: str) -> bool:
+        return player_id in self.rooms.get(room_code, {})
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.rooms.values())
+
+    def connections(self) -> Iterator[Connection]:
+        for connections in self.rooms.values():
+            yield from connections.values()
+
+    def _deliver(self, connection: Connection, payload: Union[str, bytes]) -> bool:
+        if connection.enqueue(payload):
+            self.messages_sent += 1
+            return True
+        logger.warning(f"Disconnecting slow WebSocket client {connection.player_id} in room {connection.room_code}")
+        self.slow_disconnects += 1
+        self._unregister(connection)
+        task = asyncio.create_task(self._close(connection, CLOSE_SLOW_CONSUMER))
+        self._closing.add(task)
+        task.add_done_callback(self._closed)
+        return False
+
+    def _closed(self, task: asyncio.Task) -> None:
+        self._closing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Closing a slow WebSocket client failed: {task.exception()}")
+
+    def _unregister(self, connection: Connection) -> None:
+        connections = self.rooms.get(connection.room_code)
+        if connections and connections.get(connection.player_id) is connection:
+            del connections[connection.player_id]
+            if not connections:
+                del self.rooms[connection.room_code]
+
+    async def _send_loop(self, connection: Connection) -> None:
+        try:
+            while True:
+                payload = await connection.queue.get()
+                if connection.codec.binary:
+                    await connection.websocket.send_bytes(payload)
+                else:
+                    await connection.websocket.send_text(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WebSocket send to {connection.player_id} failed: {e}")
+            self._unregister(connection)
+
+    async def _close(self, connection: Connection, code: int) -> None:
+        if connection.closed:
+            return
+        connection.closed = True
+        if connection.sender and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            # The socket is already gone
+            pass
@@ -0,0 +1,144 @@
+from abc import ABC, abstractmethod
+from hashlib import blake2b
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import asyncpg
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD = 7999
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class EventBus(ABC):
+    """Cross-worker event bus.
+
+    Events are JSON-serializable dicts. ``publish`` never blocks the caller;
+    received events are handed to the subscribers one at a time, in the
+    order they arrived. An event published with a ``target`` node id reaches
+    only that worker, so messages meant for one player are not sent to all.
+    """
+
+    def __init__(self):
+        # This worker's node id, set by the Cluster the bus belongs to
+        self.node_id = ""
+        self.handlers: List[EventHandler] = []
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._consumer: Optional[asyncio.Task] = None
+
+    def subscribe(self, handler: EventHandler) -> None:
+        self.handlers.append(handler)
+
+    @abstractmethod
+    def publish(self, event: Dict[str, Any], target: Optional[str] = None) -> None:
+        """Send ``event`` to every worker, or only to the worker ``target``"""
+
+    def _receive(self, event: Dict[str, Any]) -> None:
+        self._inbox.put_nowait(event)
+
+    async def _consume(self) -> None:
+        while True:
+            event = await self._inbox.get()
+            for handler in self.handlers:
+                try:
+                    await handler(event)
+                except Exception as e:
+                    logger.error(f"Event bus handler failed for {event.get('kind')}: {e}")
+
+    async def start(self) -> None:
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self) -> None:
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+
+
+class LocalEventBus(EventBus):
+    """In-process bus, for several nodes hosted in one process (tests, benchmarks)."""
+
+    def __init__(self):
+        super().__init__()
+        self._peers: List["LocalEventBus"] = [self]
+
+    def connect(self, other: "LocalEventBus") -> None:
+        """Join two local buses so each sees the other's events."""
+        peers = self._peers + [peer for peer in other._peers if peer not in self._peers]
+        for peer in peers:
+            peer._peers = peers
+
+    def publish(self, event: Dict[str, Any], target: Optional[str] = None) -> None:
+        for peer in self._peers:
+            if target is None or peer.node_id == target:
+                peer._receive(event)
+
+
+class PostgresEventBus(EventBus):
+    """Bus over Postgres LISTEN/NOTIFY.
+
+    Events for every worker go on ``channel``; targeted events go on a
+    channel of the target's own, which only that worker listens on. One
+    connection listens; a second one sends NOTIFYs from a queue, so
+    publishing is non-blocking and keeps per-worker ordering.
+    """
+
+    def __init__(self, database_url: str, channel: str):
+        super().__init__()
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._publisher: Optional[asyncio.Task] = None
+        self._listen_conn = None
+        self._publish_conn = None
+
+    def node_channel(self, node_id: str) -> str:
+        # Hashed, since channel names are identifiers of at most 63 bytes
+        return f"{self.channel}_{blake2b(node_id.encode(), digest_size=8).hexdigest()}"
+
+    def publish(self, event: Dict[str, Any], target: Optional[str] = None) -> None:
+        payload = json.dumps(event, separators=(",", ":"))
+        if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+            logger.error(f"Dropping {event.get('kind')} event for room {event.get('room')}: payload too large for NOTIFY")
+            return
+        channel = self.channel if target is None else self.node_channel(target)
+        self._outbox.put_nowait((channel, payload))
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            self._receive(json.loads(payload))
+        except ValueError:
+            logger.error("Ignoring malformed event bus payload")
+
+    async def _publish_loop(self) -> None:
+        while True:
+            channel, payload = await self._outbox.get()
+            try:
+                await self._publish_conn.execute("SELECT pg_notify($1, $2)", channel, payload)
+            except Exception as e:
+                logger.error(f"Event bus publish failed: {e}")
+
+    async def start(self) -> None:
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        await self._listen_conn.add_listener(self.channel, self._on_notify)
+        await self._listen_conn.add_listener(self.node_channel(self.node_id), self._on_notify)
+        self._publish_conn = await asyncpg.connect(self.dsn)
+        self._publisher = asyncio.create_task(self._publish_loop())
+        await super().start()
+
+    async def stop(self) -> None:
+        if self._publisher is not None:
+            self._publisher.cancel()
+            self._publisher = None
+        if self._listen_conn is not None:
+            await self._listen_conn.close()
+            self._listen_conn = None
+        if self._publish_conn is not None:
+            await self._publish_conn.close()
+            self._publish_conn = None
+        await super().stop()
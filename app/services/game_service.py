@@ -1,75 +1,525 @@
-from typing import Optional, Dict
-from sqlalchemy.orm import Session
+from typing import AsyncIterator, Dict, Optional, List, Tuple
+import asyncio
+import logging
 import uuid
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.models.card import Card, DECK_SIZE
 from app.models.game_room import GameRoom
-from app.dao.game_dao import GameRoomDAO, PlayerDAO
+from app.models.rules import IllegalMoveError
+from app.dao.unit_of_work import UnitOfWork
+from app.models.database_models import GameRoomDB
 from app.mappers.game_mapper import GameMapper
+from app.services.persistence import WriteBehindPersister
+from app.services.room_cache import RoomCache
+from app.services.connection_hub import ConnectionHub
+from app.services.room_actor import RoomActor
+from app.services.room_directory import RoomDirectory
+from app.services.state_cache import StateCache
+from app.services.change_notifier import ChangeNotifier
+from app.services.archiver import RoomArchiver
+from app.services.cluster import Cluster
+from app.profiler import parked
+from app.schemas import GameState, WebSocketMessage
+
+logger = logging.getLogger(__name__)
+
+# Events that change whether, and how easily, a room can be joined
+SEATING_EVENTS = frozenset({"player_joined", "player_left", "game_started"})
+
+# Fresh codes tried when a new room's code turns out to be taken
+ROOM_CODE_ATTEMPTS = 5
 
 class GameService:
-    def __init__(self, db: Session):
-        self.db = db
-        self.game_room_dao = GameRoomDAO(db)
-        self.player_dao = PlayerDAO(db)
-        self.active_games: Dict[str, GameRoom] = {}
-
-    def create_room(self) -> str:
-        # Generate room code
-        room_code = GameRoom.generate_room_code()
-        
-        # Create in database
-        db_room = self.game_room_dao.create_room(room_code)
-        
+    """Process-wide game state. Database access goes through the caller's unit of work.
+
+    Every change to a room runs on that room's ``RoomActor``, so commands for
+    one room are applied one at a time while separate rooms proceed in parallel.
+    A command that writes to the database uses its own unit of work, committed
+    before the room changes, so memory never runs ahead of a rolled-back row.
+    """
+
+    def __init__(
+        self,
+        persister: Optional[WriteBehindPersister] = None,
+        active_games: Optional[RoomCache] = None,
+        hub: Optional[ConnectionHub] = None,
+        cluster: Optional[Cluster] = None,
+        directory: Optional[RoomDirectory] = None,
+        archiver: Optional[RoomArchiver] = None,
+    ):
+        self.cluster = cluster if cluster is not None else Cluster([], "")
+        self.hub = hub if hub is not None else ConnectionHub(bus=self.cluster.bus, node_id=self.cluster.node_id)
+        self.persister = persister if persister is not None else WriteBehindPersister()
+        self.active_games = active_games if active_games is not None else RoomCache()
+        self.actors: Dict[str, RoomActor] = {}
+        self.directory = directory if directory is not None else RoomDirectory()
+        self._opening: Optional[asyncio.Future] = None
+        self.state_cache = StateCache()
+        self.notifier = ChangeNotifier()
+        self.messages_received = 0
+        self.archiver = archiver if archiver is not None else RoomArchiver(is_live=self.is_live, owns=self.owns)
+        # Evicted rooms stay reachable through the persister until their final flush
+        self.active_games.on_evict = self._on_evict
+        self._sweep_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self.persister.start()
+        self.archiver.start()
+        self._sweep_task = asyncio.create_task(self._sweep_idle_rooms())
+        if self.cluster.bus:
+            self.cluster.bus.subscribe(self.hub.on_bus_event)
+            self.cluster.bus.subscribe(self.on_bus_event)
+            await self.cluster.bus.start()
+
+    async def stop(self) -> None:
+        if self._sweep_task:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+        for actor in list(self.actors.values()):
+            await actor.drain()
+        if self.cluster.bus:
+            await self.cluster.bus.stop()
+        await self.archiver.stop()
+        await self.persister.stop()
+
+    def is_live(self, room_code: str) -> bool:
+        """Whether ``room_code`` is in memory or has changes waiting to be written"""
+        return room_code in self.active_games or self.persister.pending(room_code) is not None
+
+    def owns(self, room_code: str) -> bool:
+        """Whether this worker is the one that hosts ``room_code``"""
+        return self.cluster.owns(room_code)
+
+    async def on_bus_event(self, event: dict) -> None:
+        """Handle commands and connection changes that another worker forwarded to this room's owner"""
+        if event.get("target") != self.cluster.node_url:
+            return
+        kind = event.get("kind")
+        if kind == "command":
+            await self.handle_message(event["room"], event["player"], WebSocketMessage(**event["message"]))
+        elif kind == "connected":
+            # Private messages for the player go only to the worker holding their socket
+            self.hub.attach_remote(event["room"], event["player"], event["origin"])
+            await self.player_connected(event["room"], event["player"])
+        elif kind == "disconnected":
+            self.hub.detach_remote(event["room"], event["player"], event["origin"])
+            self.player_disconnected(event["room"], event["player"])
+
+    def _forward(self, kind: str, room_code: str, player_id: str, message: Optional[WebSocketMessage] = None) -> None:
+        owner = self.cluster.owner_of(room_code)
+        self.cluster.bus.publish({
+            "kind": kind,
+            "origin": self.cluster.node_id,
+            "target": owner,
+            "room": room_code,
+            "player": player_id,
+            "message": message.model_dump() if message else None,
+        }, target=owner)
+
+    def _on_evict(self, game_room: GameRoom) -> None:
+        self.persister.mark_dirty(game_room)
+        # Idle rooms are abandoned, so stop offering their seats and forget the code
+        self.directory.release(game_room.room_code)
+        self.state_cache.invalidate(game_room.room_code)
+        self.notifier.notify(game_room.room_code)
+        actor = self.actors.get(game_room.room_code)
+        # A busy actor is kept so a reload of the pending room reuses it
+        if actor and actor.idle:
+            del self.actors[game_room.room_code]
+
+    async def _sweep_idle_rooms(self) -> None:
+        while True:
+            await asyncio.sleep(settings.room_cache_sweep_interval)
+            evicted = self.active_games.evict_idle()
+            if evicted:
+                logger.info(f"Evicted {len(evicted)} idle rooms")
+            for room_code, actor in list(self.actors.items()):
+                if actor.idle and room_code not in self.active_games:
+                    del self.actors[room_code]
+
+    async def get_room(self, uow: UnitOfWork, room_code: str) -> Optional[GameRoom]:
+        """Return the in-memory room, reloading it if it was evicted"""
+        game_room = self.active_games.get(room_code)
+        if game_room:
+            return game_room
+        game_room = self.persister.pending(room_code)
+        if game_room:
+            self.active_games[room_code] = game_room
+            return game_room
+        return await self.load_game(uow, room_code)
+
+    async def get_actor(self, uow: UnitOfWork, room_code: str) -> Optional[RoomActor]:
+        """Return the actor that serializes commands for ``room_code``, loading the room if needed"""
+        game_room = await self.get_room(uow, room_code)
+        if not game_room:
+            return None
+        actor = self.actors.get(room_code)
+        if actor is None or actor.game_room is not game_room:
+            actor = self.actors[room_code] = RoomActor(game_room, self.publish)
+        return actor
+
+    async def create_room(self, uow: UnitOfWork) -> str:
+        """Create an empty room. Commits ``uow``, so the room is only offered once its row exists."""
+        # Generate an unused room code that this worker owns; the unique constraint catches codes in use elsewhere
+        for _ in range(ROOM_CODE_ATTEMPTS):
+            room_code = self.directory.new_code(self.owns)
+            try:
+                async with uow.savepoint():
+                    db_room = await uow.rooms.create_room(room_code)
+                break
+            except IntegrityError:
+                self.directory.release(room_code)
+            except BaseException:
+                self.directory.release(room_code)
+                raise
+        else:
+            raise RuntimeError(f"No unused room code found in {ROOM_CODE_ATTEMPTS} attempts")
+
+        # Commit before the room is registered, so nobody can join a room whose row could still roll back
+        try:
+            await uow.commit()
+        except BaseException:
+            self.directory.release(room_code)
+            raise
+
         # Create in-memory game
-        game_room = GameRoom(room_code=room_code)
-        self.active_games[room_code] = game_room
-        
+        game_room = GameRoom(room_code=room_code, db_id=db_room.id)
+        self._register_room(game_room)
+
         return room_code
 
-    def join_room(self, room_code: str, player_name: str) -> Optional[str]:
+    def _register_room(self, game_room: GameRoom) -> None:
+        self.active_games[game_room.room_code] = game_room
+        self.actors[game_room.room_code] = RoomActor(game_room, self.publish)
+        self.directory.update(game_room)
+
+    async def provision_rooms(self, uow: UnitOfWork, tables: List[List[str]]) -> List[Tuple[str, List[Tuple[str, str]]]]:
+        """Create a room for each entry of ``tables`` and seat the players named in it, in two queries.
+
+        Returns ``(room_code, [(player_name, player_id), ...])`` per table, in order.
+        Raises ``RoomFullError`` before writing anything if a table has too many players.
+        Commits ``uow``, so the rooms are only offered once their rows exist.
+        """
+        # Seat everyone in memory first, so an oversized table fails before any insert
+        game_rooms = []
+        try:
+            for names in tables:
+                game_room = GameRoom(room_code=self.directory.new_code(self.owns))
+                game_rooms.append(game_room)
+                for name in names:
+                    game_room.add_player(str(uuid.uuid4()), name)
+
+            for _ in range(ROOM_CODE_ATTEMPTS):
+                # Replace codes already in use elsewhere, then insert; a race lost to another worker retries
+                taken = await uow.rooms.get_taken_codes([game_room.room_code for game_room in game_rooms])
+                for game_room in game_rooms:
+                    if game_room.room_code in taken:
+                        self.directory.release(game_room.room_code)
+                        game_room.room_code = self.directory.new_code(self.owns)
+                try:
+                    async with uow.savepoint():
+                        room_ids = await uow.rooms.create_rooms([game_room.room_code for game_room in game_rooms])
+                    break
+                except IntegrityError:
+                    continue
+            else:
+                raise RuntimeError(f"No unused room codes found in {ROOM_CODE_ATTEMPTS} attempts")
+
+            player_rows = []
+            for game_room in game_rooms:
+                game_room.db_id = room_ids[game_room.room_code]
+                player_rows.extend(
+                    {"player_id": player.id, "name": player.name, "game_room_id": game_room.db_id}
+                    for player in game_room.players.values()
+                )
+            await uow.players.create_players(player_rows)
+            # Commit before the rooms are registered, so nobody can join a room whose row could still roll back
+            await uow.commit()
+        except BaseException:
+            # Nothing was registered, so give the codes back
+            for game_room in game_rooms:
+                self.directory.release(game_room.room_code)
+            raise
+
+        for game_room in game_rooms:
+            self._register_room(game_room)
+            # The joins go into the event log like any other, so the rooms replay the same
+            self.persister.mark_dirty(game_room, events=game_room.events_since(0))
+        return [
+            (game_room.room_code, [(player.name, player.id) for player in game_room.players.values()])
+            for game_room in game_rooms
+        ]
+
+    async def join_room(self, uow: UnitOfWork, room_code: str, player_name: str) -> Optional[str]:
+        """Add a player to a room. Returns None if the room does not exist.
+
+        Raises ``IllegalMoveError`` (``RoomFullError`` when full) if the room cannot be joined.
+        """
         # Check if room exists
-        db_room = self.game_room_dao.get_room_by_code(room_code)
-        if not db_room:
+        actor = await self.get_actor(uow, room_code)
+        if not actor:
             return None
+        return await actor.submit(lambda game_room: self._join(game_room, player_name))
+
+    async def _join(self, game_room: GameRoom, player_name: str) -> str:
+        # Refuse before anything is written
+        game_room.check_can_join()
 
-        # Create player
+        # Create player in the actor's own transaction, committed before the seat is taken, since
+        # the caller's unit of work may still roll back (a cancelled request) after the player is seated
         player_id = str(uuid.uuid4())
-        db_player = self.player_dao.create_player(player_id, player_name, db_room.id)
+        async with UnitOfWork() as uow:
+            await uow.players.create_player(player_id, player_name, game_room.db_id)
 
         # Add to in-memory game
-        if room_code in self.active_games:
-            self.active_games[room_code].add_player(player_id, player_name)
+        game_room.add_player(player_id, player_name)
 
         return player_id
 
-    def update_game_state(self, room_code: str):
-        """Sync in-memory game state with database"""
-        if room_code not in self.active_games:
+    async def quick_join(self, uow: UnitOfWork, player_name: str) -> Tuple[str, str]:
+        """Seat a player in the fullest open room, creating a room if none has a free seat.
+
+        Returns ``(room_code, player_id)``.
+        """
+        while True:
+            room_code = self.directory.find_open()
+            if room_code is None:
+                room_code = await self._open_room()
+            try:
+                player_id = await self.join_room(uow, room_code, player_name)
+            except IllegalMoveError:
+                # Someone else took the last seat, or the game started, first
+                self.directory.remove(room_code)
+                continue
+            if player_id:
+                return room_code, player_id
+            self.directory.remove(room_code)
+
+    async def _open_room(self) -> str:
+        # Concurrent quick-joins share one new room, committed before anyone joins it
+        if self._opening is None:
+            self._opening = asyncio.ensure_future(self._create_open_room())
+        return await asyncio.shield(self._opening)
+
+    async def _create_open_room(self) -> str:
+        try:
+            async with UnitOfWork() as uow:
+                return await self.create_room(uow)
+        finally:
+            self._opening = None
+
+    async def load_game(self, uow: UnitOfWork, room_code: str) -> Optional[GameRoom]:
+        """Load game from database into memory, replaying its event log from the latest snapshot"""
+        game_rooms = await self.load_games(uow, [room_code])
+        return game_rooms[0] if game_rooms else None
+
+    async def load_games(self, uow: UnitOfWork, room_codes: List[str]) -> List[GameRoom]:
+        """Load many rooms with their players in a fixed number of queries"""
+        db_rooms = await uow.rooms.get_rooms_with_players(room_codes)
+        return await self._register_rooms(uow, db_rooms)
+
+    async def warm_start(self, uow: UnitOfWork, batch_size: int = settings.warm_start_batch_size) -> int:
+        """Preload this worker's in-progress rooms, up to the cache capacity. Returns the number loaded."""
+        loaded = 0
+        after_id = 0
+        while loaded < self.active_games.max_size:
+            limit = min(batch_size, self.active_games.max_size - loaded)
+            db_rooms = await uow.rooms.get_started_rooms_with_players(after_id, limit)
+            if not db_rooms:
+                break
+            after_id = db_rooms[-1].id
+            # Rooms hashed to other workers are theirs to load
+            db_rooms = [db_room for db_room in db_rooms if self.owns(db_room.room_code)]
+            loaded += len(await self._register_rooms(uow, db_rooms))
+        return loaded
+
+    async def _register_rooms(self, uow: UnitOfWork, db_rooms: List[GameRoomDB]) -> List[GameRoom]:
+        room_ids = [db_room.id for db_room in db_rooms]
+        snapshots = await uow.events.get_latest_snapshots(room_ids)
+        events = await uow.events.get_events_since_snapshots(room_ids)
+        game_rooms = []
+        for db_room in db_rooms:
+            # Convert to domain model using mapper
+            game_room = GameMapper.to_game_room(db_room, snapshots.get(db_room.id), events.get(db_room.id, ()))
+            self.active_games[game_room.room_code] = game_room
+            self.directory.update(game_room)
+            game_rooms.append(game_room)
+        return game_rooms
+
+    async def get_game_state(self, uow: UnitOfWork, room_code: str, player_id: Optional[str] = None) -> Optional[GameState]:
+        """Build the game state for a room, including ``player_id``'s hand if given"""
+        game_room = await self.get_room(uow, room_code)
+        if not game_room:
+            return None
+        return GameMapper.to_game_state(game_room, player_id)
+
+    async def get_game_state_json(
+        self, uow: UnitOfWork, room_code: str, player_id: Optional[str] = None
+    ) -> Optional[Tuple[int, bytes]]:
+        """Return ``(version, serialized GameState)``, reusing the cached body while the room is unchanged"""
+        game_room = await self.get_room(uow, room_code)
+        if not game_room:
+            return None
+        return game_room.version, self.state_cache.get(game_room, player_id)
+
+    async def wait_for_change(self, room_code: str, since: int, timeout: Optional[float] = None) -> bool:
+        """Park until ``room_code`` is no longer at version ``since``. Returns False on timeout."""
+        if timeout is None:
+            timeout = settings.long_poll_timeout
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            game_room = self.active_games.peek(room_code)
+            if game_room is None or game_room.version != since:
+                return True
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return False
+            with parked():
+                changed = await self.notifier.wait(room_code, remaining)
+            if not changed:
+                return False
+
+    async def stream_game_state(
+        self, room_code: str, player_id: Optional[str] = None, since: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Yield the room state as Server-Sent Events: now, unless the client has ``since``, then after every change"""
+        version = since
+        while True:
+            async with UnitOfWork() as uow:
+                cached = await self.get_game_state_json(uow, room_code, player_id)
+            if not cached:
+                return
+            if cached[0] != version:
+                version, body = cached
+                yield b"event: state\nid: %d\ndata: %s\n\n" % (version, body)
+            if not await self.wait_for_change(room_code, version, settings.sse_keepalive_interval):
+                # A comment line keeps proxies from timing out an idle stream
+                yield b": keepalive\n\n"
+
+    async def handle_message(self, room_code: str, player_id: str, message: WebSocketMessage) -> None:
+        """Apply one WebSocket command and push the resulting deltas to the room"""
+        self.messages_received += 1
+        if not self.owns(room_code):
+            self._forward("command", room_code, player_id, message)
             return
+        async with UnitOfWork() as uow:
+            actor = await self.get_actor(uow, room_code)
+        if actor:
+            await actor.submit(lambda game_room: self._handle_command(game_room, player_id, message))
 
-        game_room = self.active_games[room_code]
-        db_room = self.game_room_dao.get_room_by_code(room_code)
-        
-        if db_room:
-            # Update room state
-            self.game_room_dao.update_room_state(
-                db_room,
-                game_room.is_game_started,
-                game_room.current_turn
+    def _handle_command(self, game_room: GameRoom, player_id: str, message: WebSocketMessage) -> None:
+        if player_id not in game_room.players:
+            return
+
+        data = message.data or {}
+        try:
+            if message.type == "sync":
+                version = int(data.get("version", 0))
+                if version < 0:
+                    raise ValueError(f"Invalid version: {version}")
+                self.sync(game_room, player_id, version)
+                return
+            self.apply_command(game_room, player_id, message.type, data)
+        except (IllegalMoveError, KeyError, TypeError, ValueError) as e:
+            self.hub.send(game_room.room_code, player_id, WebSocketMessage(type="error", data={"message": str(e)}))
+        game_room.players[player_id].update_activity()
+
+    def apply_command(self, game_room: GameRoom, player_id: str, command: str, data: dict) -> None:
+        """Run a client command against a room. Raises ``IllegalMoveError`` if it is rejected."""
+        if command == "ready":
+            game_room.set_ready(player_id, bool(data.get("is_ready", True)))
+        elif command == "start":
+            if not game_room.start_game():
+                raise IllegalMoveError("Game cannot start until at least two players are ready")
+        elif command == "bid":
+            game_room.place_bid(player_id, int(data["bid"]))
+        elif command == "play":
+            card_index = int(data["card"])
+            if not 0 <= card_index < DECK_SIZE:
+                raise IllegalMoveError(f"Invalid card: {card_index}")
+            game_room.play_card(player_id, Card.from_index(card_index))
+        else:
+            raise IllegalMoveError(f"Unknown command: {command}")
+
+    def publish(self, game_room: GameRoom, since_version: int) -> None:
+        """Broadcast the deltas after ``since_version`` and queue the room for persistence"""
+        events = game_room.events_since(since_version)
+        if events is None:
+            self._publish_snapshot(game_room, since_version)
+            return
+        if not events:
+            return
+        self.persister.mark_dirty(game_room, events=events)
+        self.state_cache.invalidate(game_room.room_code)
+        self.notifier.notify(game_room.room_code)
+        if any(event.type in SEATING_EVENTS for event in events):
+            self.directory.update(game_room)
+        self.hub.broadcast(game_room.room_code, WebSocketMessage(
+            type="delta",
+            data={"version": game_room.version, "events": [event.public() for event in events]}
+        ))
+        for event in events:
+            if event.private and "hands" in event.private:
+                for player_id, mask in event.private["hands"].items():
+                    self.hub.send(game_room.room_code, player_id, GameMapper.to_hand_message(event.version, mask))
+
+    def _publish_snapshot(self, game_room: GameRoom, since_version: int) -> None:
+        """Publish changes too many to replay: the batch made more events than a room retains"""
+        logger.warning(f"Room {game_room.room_code} outran its event history; sending snapshots")
+        # The log keeps the events still retained, and the snapshot covers the gap before them
+        retained = [event for event in game_room.events if event.version > since_version]
+        self.persister.mark_dirty(game_room, events=retained, snapshot=True)
+        self.state_cache.invalidate(game_room.room_code)
+        self.notifier.notify(game_room.room_code)
+        self.directory.update(game_room)
+        for player_id in game_room.players:
+            self.send_snapshot(game_room, player_id)
+
+    def sync(self, game_room: GameRoom, player_id: str, version: int) -> None:
+        """Bring one client up to date: deltas if we still have them, otherwise a full snapshot"""
+        events = game_room.events_since(version)
+        if events is None:
+            self.send_snapshot(game_room, player_id)
+            return
+        self.hub.send(game_room.room_code, player_id, WebSocketMessage(
+            type="delta",
+            data={"version": game_room.version, "events": [event.public() for event in events]}
+        ))
+        hand_events = [event for event in events if event.private and "hands" in event.private]
+        if hand_events:
+            self.hub.send(
+                game_room.room_code,
+                player_id,
+                GameMapper.to_hand_message(game_room.version, game_room.players[player_id].hand.mask)
             )
-            
-            # Update player states
-            for player in game_room.players.values():
-                db_player = self.player_dao.get_player(player.id, db_room.id)
-                if db_player:
-                    self.player_dao.update_player_ready(db_player, player.is_ready)
-
-    def load_game(self, room_code: str) -> Optional[GameRoom]:
-        """Load game from database into memory"""
-        db_room = self.game_room_dao.get_room_by_code(room_code)
-        if not db_room:
-            return None
 
-        # Convert to domain model using mapper
-        game_room = GameMapper.to_game_room(db_room)
-        self.active_games[room_code] = game_room
-        return game_room
\ No newline at end of file
+    def send_snapshot(self, game_room: GameRoom, player_id: str) -> None:
+        state = GameMapper.to_game_state(game_room, player_id)
+        self.hub.send(game_room.room_code, player_id, WebSocketMessage(type="snapshot", data=state.model_dump()))
+
+    async def player_connected(self, room_code: str, player_id: str) -> None:
+        """Greet a newly connected player with a snapshot and tell the room"""
+        if not self.owns(room_code):
+            self._forward("connected", room_code, player_id)
+            return
+        async with UnitOfWork() as uow:
+            game_room = await self.get_room(uow, room_code)
+        if not game_room or player_id not in game_room.players:
+            await self.hub.close(room_code, player_id, code=1008)
+            return
+        self.send_snapshot(game_room, player_id)
+        self.hub.broadcast(
+            room_code,
+            WebSocketMessage(type="player_connected", data={"player_id": player_id}),
+            exclude=player_id
+        )
+
+    def player_disconnected(self, room_code: str, player_id: str) -> None:
+        if not self.owns(room_code):
+            self._forward("disconnected", room_code, player_id)
+            return
+        self.hub.broadcast(
+            room_code,
+            WebSocketMessage(type="player_disconnected", data={"player_id": player_id})
+        )
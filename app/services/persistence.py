@@ -0,0 +1,274 @@
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+from sqlalchemy.exc import DBAPIError, OperationalError
+from app.config import settings
+from app.dao.unit_of_work import UnitOfWork
+from app.mappers.game_mapper import GameMapper
+from app.models.events import GameEvent
+from app.models.game_room import GameRoom
+
+logger = logging.getLogger(__name__)
+
+# Room, player, event and snapshot rows of one flush
+Rows = Tuple[list, list, list, list]
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed write may succeed if simply retried, such as when the database is unreachable"""
+    if isinstance(error, DBAPIError):
+        return isinstance(error, OperationalError) or error.connection_invalidated
+    return isinstance(error, (OSError, asyncio.TimeoutError))
+
+
+class WriteBehindPersister:
+    """Write-behind persistence for in-memory rooms.
+
+    Mutations only mark a room (and optionally some of its players) dirty.
+    A background task flushes everything that is dirty every
+    ``flush_interval`` seconds as one bulk transaction, so any number of
+    changes to a room between flushes costs a single row write, and no row
+    is more than about one interval behind memory.
+
+    Events passed to ``mark_dirty`` are appended to the room's event log in
+    the same transaction, and a full snapshot of the room is written each
+    time its version crosses a multiple of ``snapshot_interval``.
+
+    If the database is unreachable the whole batch is kept for the next
+    flush. Any other failure is retried room by room, so one bad row only
+    holds back its own room. A room that still fails after
+    ``max_attempts`` flushes has its pending changes logged and dropped; if
+    events were among them, a full snapshot is queued in their place, so the
+    gap they leave in the log is never replayed across.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = settings.persist_flush_interval,
+        uow_factory: Callable[[], UnitOfWork] = UnitOfWork,
+        snapshot_interval: int = settings.snapshot_interval,
+        max_attempts: int = settings.persist_max_attempts,
+    ):
+        self.flush_interval = flush_interval
+        self.uow_factory = uow_factory
+        self.snapshot_interval = snapshot_interval
+        self.max_attempts = max_attempts
+        self._rooms: Dict[str, GameRoom] = {}
+        self._dirty_rooms: Set[str] = set()
+        self._dirty_players: Dict[str, Set[str]] = {}
+        self._events: Dict[str, List[GameEvent]] = {}
+        self._snapshots: Set[str] = set()
+        # Rooms of the batch being written
+        self._flushing: Dict[str, GameRoom] = {}
+        # Consecutive failed flushes per room
+        self._failures: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.rows_written = 0
+        self.snapshots_written = 0
+        self.rooms_dropped = 0
+
+    def mark_dirty(
+        self,
+        game_room: GameRoom,
+        player_ids: Optional[Iterable[str]] = None,
+        events: Iterable[GameEvent] = (),
+        snapshot: bool = False,
+    ) -> None:
+        """Schedule ``game_room`` for the next flush.
+
+        With ``player_ids`` only those players' rows are written; the room row
+        is written whenever ``player_ids`` is omitted. ``events`` are queued
+        for the event log, in order. ``snapshot`` forces a snapshot of the
+        room, for when some of its events could not be logged.
+        """
+        room_code = game_room.room_code
+        self._rooms[room_code] = game_room
+        if player_ids is None:
+            self._dirty_rooms.add(room_code)
+        else:
+            self._dirty_players.setdefault(room_code, set()).update(player_ids)
+        if events:
+            self._events.setdefault(room_code, []).extend(events)
+        if snapshot:
+            self._snapshots.add(room_code)
+
+    def pending(self, room_code: str) -> Optional[GameRoom]:
+        """Return the room if it has changes that are not yet flushed."""
+        return self._rooms.get(room_code) or self._flushing.get(room_code)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._rooms)
+
+    async def flush(self) -> int:
+        """Write every dirty room in one transaction. Returns the number of rooms flushed."""
+        async with self._lock:
+            if not self._rooms:
+                return 0
+            batch = self._rooms, self._dirty_rooms, self._dirty_players, self._events, self._snapshots
+            self._rooms, self._dirty_rooms, self._dirty_players, self._events, self._snapshots = {}, set(), {}, {}, set()
+            # pending() keeps returning the batch's rooms until they are written or requeued, so an
+            # evicted room is not reloaded from rows that lack the writes still in flight
+            self._flushing = batch[0]
+            try:
+                return await self._flush_batch(*batch)
+            finally:
+                self._flushing = {}
+
+    async def _flush_batch(
+        self,
+        rooms: Dict[str, GameRoom],
+        dirty_rooms: Set[str],
+        dirty_players: Dict[str, Set[str]],
+        events: Dict[str, List[GameEvent]],
+        snapshots: Set[str],
+    ) -> int:
+        # Rows are built before the first await so they are a consistent snapshot
+        room_rows = {
+            room_code: self._rows(
+                game_room, room_code in dirty_rooms, dirty_players.get(room_code, ()),
+                events.get(room_code), room_code in snapshots,
+            )
+            for room_code, game_room in rooms.items()
+        }
+        rows = tuple([row for rows in room_rows.values() for row in rows[table]] for table in range(4))
+        try:
+            await self._write(*rows)
+        except Exception as e:
+            if is_transient(e):
+                logger.error(f"Write-behind flush of {len(rooms)} rooms failed: {e}")
+                self._requeue(rooms, dirty_rooms, dirty_players, events, snapshots)
+                return 0
+            # One bad row fails the whole batch, so find it by writing each room on its own
+            logger.warning(f"Write-behind flush of {len(rooms)} rooms failed, retrying room by room: {e}")
+            flushed = 0
+            for room_code, rows in room_rows.items():
+                written = await self._flush_room(room_code, rows)
+                if written:
+                    flushed += 1
+                elif written is False:
+                    self._requeue(
+                        {room_code: rooms[room_code]},
+                        dirty_rooms & {room_code},
+                        {room_code: dirty_players[room_code]} if room_code in dirty_players else {},
+                        {room_code: events[room_code]} if room_code in events else {},
+                        snapshots & {room_code},
+                    )
+                elif room_code in events:
+                    # The dropped events leave a gap in the log, which a full snapshot of the room covers
+                    self.mark_dirty(rooms[room_code], snapshot=True)
+            return flushed
+
+        self._failures.clear()
+        self._count(*rows)
+        return len(rooms)
+
+    def _rows(
+        self,
+        game_room: GameRoom,
+        room_dirty: bool,
+        dirty_players: Iterable[str],
+        events: Optional[List[GameEvent]],
+        snapshot: bool,
+    ) -> Rows:
+        player_states = GameMapper.to_player_states(game_room)
+        if room_dirty:
+            room_states = [GameMapper.to_room_state(game_room)]
+        else:
+            room_states = []
+            player_states = [state for state in player_states if state["player_id"] in dirty_players]
+        event_rows = []
+        snapshot_rows = []
+        if events:
+            event_rows = GameMapper.to_event_rows(game_room, events)
+            first, last = events[0].version, events[-1].version
+            snapshot = snapshot or last // self.snapshot_interval > (first - 1) // self.snapshot_interval
+        if snapshot:
+            snapshot_rows.append(GameMapper.to_snapshot_row(game_room))
+        return room_states, player_states, event_rows, snapshot_rows
+
+    async def _write(self, room_states: list, player_states: list, event_rows: list, snapshot_rows: list) -> None:
+        async with self.uow_factory() as uow:
+            await uow.rooms.update_room_states(room_states)
+            await uow.players.update_player_states(player_states)
+            await uow.events.append_events(event_rows)
+            await uow.events.save_snapshots(snapshot_rows)
+
+    def _count(self, room_states: list, player_states: list, event_rows: list, snapshot_rows: list) -> None:
+        self.flushes += 1
+        self.rows_written += len(room_states) + len(player_states) + len(event_rows) + len(snapshot_rows)
+        self.snapshots_written += len(snapshot_rows)
+
+    async def _flush_room(self, room_code: str, rows: Rows) -> Optional[bool]:
+        """Write one room of a failed batch in its own transaction.
+
+        Returns True if it was written, False if its changes should be kept
+        for the next flush, and None if they were dropped.
+        """
+        try:
+            await self._write(*rows)
+        except Exception as e:
+            if is_transient(e):
+                logger.error(f"Write-behind flush of room {room_code} failed: {e}")
+                return False
+            attempts = self._failures.get(room_code, 0) + 1
+            if attempts < self.max_attempts:
+                logger.error(f"Write-behind flush of room {room_code} failed (attempt {attempts}): {e}")
+                self._failures[room_code] = attempts
+                return False
+            # Retrying cannot fix a row the database rejects; keep the other rooms flowing
+            logger.error(
+                f"Dropping unwritable changes to room {room_code} after {attempts} attempts "
+                f"({len(rows[2])} events lost): {e}"
+            )
+            self._failures.pop(room_code, None)
+            self.rooms_dropped += 1
+            return None
+        self._failures.pop(room_code, None)
+        self._count(*rows)
+        return True
+
+    def _requeue(
+        self,
+        rooms: Dict[str, GameRoom],
+        dirty_rooms: Set[str],
+        dirty_players: Dict[str, Set[str]],
+        events: Dict[str, List[GameEvent]],
+        snapshots: Set[str],
+    ) -> None:
+        # Merge a failed batch back without clobbering anything marked since
+        for room_code, game_room in rooms.items():
+            self._rooms.setdefault(room_code, game_room)
+        self._dirty_rooms |= dirty_rooms
+        self._snapshots |= snapshots
+        for room_code, player_ids in dirty_players.items():
+            self._dirty_players.setdefault(room_code, set()).update(player_ids)
+        for room_code, room_events in events.items():
+            # Older events go back in front of anything logged since
+            self._events[room_code] = room_events + self._events.get(room_code, [])
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush loop error: {e}")
+
+    def start(self) -> None:
+        """Start the periodic flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush task and write out anything still dirty."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
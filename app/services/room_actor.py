@@ -0,0 +1,87 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple, Union
+import asyncio
+import inspect
+import logging
+from app.config import settings
+from app.models.game_room import GameRoom
+
+logger = logging.getLogger(__name__)
+
+Command = Callable[[GameRoom], Union[Any, Awaitable[Any]]]
+
+
+class RoomActor:
+    """Runs every command for one room, one at a time, in arrival order.
+
+    Commands are plain or async callables taking the room. Nothing else may
+    mutate the room, so commands never see a half-applied change, while
+    different rooms' actors run independently. The worker task only exists
+    while commands are queued. After each batch of up to ``batch_size``
+    commands ``on_batch(room, version_before_batch)`` is called once, so a
+    burst of moves is broadcast and persisted together.
+    """
+
+    def __init__(
+        self,
+        game_room: GameRoom,
+        on_batch: Callable[[GameRoom, int], None],
+        batch_size: int = settings.room_actor_batch_size,
+    ):
+        self.game_room = game_room
+        self.on_batch = on_batch
+        self.batch_size = batch_size
+        self._queue: Deque[Tuple[Command, asyncio.Future]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self.commands = 0
+        self.batches = 0
+
+    def submit(self, command: Command) -> asyncio.Future:
+        """Queue ``command``. The returned future resolves to its result or raises its error."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((command, future))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    @property
+    def idle(self) -> bool:
+        return self._task is None
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    async def drain(self) -> None:
+        """Wait until every queued command has run."""
+        while self._task is not None:
+            await self._task
+
+    async def _run(self) -> None:
+        try:
+            while self._queue:
+                version = self.game_room.version
+                for _ in range(min(self.batch_size, len(self._queue))):
+                    command, future = self._queue.popleft()
+                    if future.cancelled():
+                        continue
+                    try:
+                        result = command(self.game_room)
+                        if inspect.isawaitable(result):
+                            result = await result
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                    self.commands += 1
+                self.batches += 1
+                try:
+                    self.on_batch(self.game_room, version)
+                except Exception as e:
+                    logger.error(f"Room {self.game_room.room_code} batch handler failed: {e}")
+                # Let callers and other rooms run before the next batch
+                await asyncio.sleep(0)
+        finally:
+            self._task = None
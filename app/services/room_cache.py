@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+import time
+from app.config import settings
+from app.models.game_room import GameRoom
+
+
+class RoomCache:
+    """Bounded cache of in-memory rooms.
+
+    Rooms are kept in least-recently-used order. Inserting past ``max_size``
+    evicts the least recently used room, and ``evict_idle`` drops rooms that
+    have not been touched and have had no player activity for ``idle_ttl``
+    seconds. Every evicted room is handed to ``on_evict`` so it can be
+    persisted before it is forgotten.
+    """
+
+    def __init__(
+        self,
+        max_size: int = settings.room_cache_size,
+        idle_ttl: float = settings.room_idle_ttl,
+        on_evict: Optional[Callable[[GameRoom], None]] = None,
+    ):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self._rooms: "OrderedDict[str, GameRoom]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, room_code: str, default: Optional[GameRoom] = None) -> Optional[GameRoom]:
+        """Look up a room, counting a hit or miss and marking it recently used."""
+        game_room = self._rooms.get(room_code)
+        if game_room is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._rooms.move_to_end(room_code)
+        self._touched[room_code] = time.monotonic()
+        return game_room
+
+    def peek(self, room_code: str) -> Optional[GameRoom]:
+        """Look up a room without affecting recency or counters."""
+        return self._rooms.get(room_code)
+
+    def __getitem__(self, room_code: str) -> GameRoom:
+        game_room = self.get(room_code)
+        if game_room is None:
+            raise KeyError(room_code)
+        return game_room
+
+    def __setitem__(self, room_code: str, game_room: GameRoom) -> None:
+        self._rooms[room_code] = game_room
+        self._rooms.move_to_end(room_code)
+        self._touched[room_code] = time.monotonic()
+        while len(self._rooms) > self.max_size:
+            oldest = next(iter(self._rooms))
+            self._evict(oldest)
+
+    def __contains__(self, room_code: object) -> bool:
+        return room_code in self._rooms
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rooms)
+
+    def values(self):
+        return self._rooms.values()
+
+    def items(self):
+        return self._rooms.items()
+
+    def pop(self, room_code: str, default: Optional[GameRoom] = None) -> Optional[GameRoom]:
+        """Remove a room without treating it as an eviction."""
+        self._touched.pop(room_code, None)
+        return self._rooms.pop(room_code, default)
+
+    def _evict(self, room_code: str) -> GameRoom:
+        game_room = self._rooms.pop(room_code)
+        self._touched.pop(room_code, None)
+        self.evictions += 1
+        if self.on_evict:
+            self.on_evict(game_room)
+        return game_room
+
+    def evict_idle(self) -> List[GameRoom]:
+        """Evict rooms idle for longer than ``idle_ttl``. Returns the evicted rooms."""
+        now = time.monotonic()
+        cutoff = now - self.idle_ttl
+        activity_cutoff = datetime.now() - timedelta(seconds=self.idle_ttl)
+        idle = []
+        # LRU order means touch times increase along the dict, so stop at the first fresh room
+        for room_code, game_room in self._rooms.items():
+            if self._touched.get(room_code, now) > cutoff:
+                break
+            if game_room.last_activity() <= activity_cutoff:
+                idle.append(room_code)
+        return [self._evict(room_code) for room_code in idle]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._rooms),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
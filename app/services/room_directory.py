@@ -0,0 +1,70 @@
+from typing import Callable, Dict, Optional, Set
+from app.models.game_room import GameRoom
+
+
+class RoomDirectory:
+    """In-memory index of the room codes this worker holds and of rooms with open seats.
+
+    Rooms that have not started and still have a free seat are bucketed by
+    the number of free seats. Quick-join takes the room that has waited
+    longest in the fullest bucket, so tables fill up and start rather than spreading
+    players thinly. Updates and lookups are O(1), since there is one bucket
+    per seat count.
+
+    New codes are checked against the rooms held in memory, including ones
+    not yet committed; collisions with any other room are left to the
+    database's unique constraint. A code is released when its room leaves
+    memory, so the set stays as small as the room cache.
+    """
+
+    def __init__(self):
+        self._codes: Set[str] = set()
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._free: Dict[str, int] = {}
+
+    def new_code(self, accept: Callable[[str], bool] = lambda room_code: True) -> str:
+        """Reserve an unused room code for which ``accept`` is true."""
+        while True:
+            room_code = GameRoom.generate_room_code()
+            if room_code not in self._codes and accept(room_code):
+                self._codes.add(room_code)
+                return room_code
+
+    def update(self, game_room: GameRoom) -> None:
+        """Re-index a room after a join, leave or start."""
+        room_code = game_room.room_code
+        self._codes.add(room_code)
+        self.remove(room_code)
+        free = game_room.free_seats
+        if not game_room.is_game_started and free > 0:
+            self._buckets.setdefault(free, {})[room_code] = None
+            self._free[room_code] = free
+
+    def remove(self, room_code: str) -> None:
+        """Take a room out of the open-seat index; its code stays reserved."""
+        free = self._free.pop(room_code, None)
+        if free is not None:
+            del self._buckets[free][room_code]
+
+    def release(self, room_code: str) -> None:
+        """Forget a room that left memory, or a code that was never used."""
+        self.remove(room_code)
+        self._codes.discard(room_code)
+
+    def find_open(self) -> Optional[str]:
+        """Return the open room with the fewest free seats, or None if every room is full."""
+        for free in sorted(self._buckets):
+            bucket = self._buckets[free]
+            if bucket:
+                return next(iter(bucket))
+        return None
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "codes": len(self._codes),
+            "open_rooms": len(self._free),
+            **{f"free_{free}": len(bucket) for free, bucket in sorted(self._buckets.items())},
+        }
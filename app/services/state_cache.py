@@ -0,0 +1,38 @@
+from typing import Dict, Optional, Tuple
+from app.mappers.game_mapper import GameMapper
+from app.models.game_room import GameRoom
+
+
+class StateCache:
+    """Serialized ``GameState`` responses per room and viewer.
+
+    An entry is only valid for the room version it was built from, so a
+    poll that finds nothing new costs a dict lookup instead of building and
+    serializing the state again. Rooms drop their entries when they change
+    or are evicted.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[Optional[str], Tuple[int, bytes]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, game_room: GameRoom, player_id: Optional[str] = None) -> bytes:
+        """Return the JSON state of ``game_room`` as seen by ``player_id``."""
+        # Anyone who is not seated sees the public state, so they share one entry
+        viewer = player_id if player_id in game_room.players else None
+        entries = self._entries.setdefault(game_room.room_code, {})
+        entry = entries.get(viewer)
+        if entry is not None and entry[0] == game_room.version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        body = GameMapper.to_game_state(game_room, viewer).model_dump_json().encode()
+        entries[viewer] = (game_room.version, body)
+        return body
+
+    def invalidate(self, room_code: str) -> None:
+        self._entries.pop(room_code, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"rooms": len(self._entries), "hits": self.hits, "misses": self.misses}
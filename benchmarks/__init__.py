@@ -0,0 +1 @@
+"""Benchmarks for the Spades3 API, see ``python -m benchmarks.run --help``"""
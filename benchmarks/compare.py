@@ -0,0 +1,56 @@
+"""Compare two benchmark result files: python -m benchmarks.compare OLD.json NEW.json"""
+from typing import Any, Dict, Iterator, Tuple
+import argparse
+import json
+import sys
+
+# Metrics to compare, and whether a higher value is better
+METRICS = {
+    "per_second": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "ops_per_second": True,
+}
+
+
+def _rows(report: Dict[str, Any]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    for suite in ("micro", "rest", "ws"):
+        for name, row in report.get(suite, {}).items():
+            yield suite, name, row
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> int:
+    """Print the change of every shared metric. Returns how many regressed by more than ``threshold``."""
+    old_rows = {(suite, name): row for suite, name, row in _rows(old)}
+    regressions = 0
+    for suite, name, row in _rows(new):
+        before = old_rows.get((suite, name))
+        if not before:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if not before.get(metric) or row.get(metric) is None:
+                continue
+            change = (row[metric] - before[metric]) / before[metric]
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{suite:<6}{name:<26}{metric:<16}{before[metric]:>12}{row[metric]:>12}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+    with open(args.old) as old, open(args.new) as new:
+        regressions = compare(json.load(old), json.load(new), args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
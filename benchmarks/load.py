@@ -0,0 +1,281 @@
+"""End-to-end load against a running server: REST phases, then WebSocket games played by bots"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import time
+import httpx
+from websockets.asyncio.client import connect
+from app.codec import CODECS, JSON_CODEC
+from app.models.card import SUIT_MASKS, Suit, card_index
+from app.models.rules import NON_SPADE_MASK, SPADES
+from app.schemas import WebSocketMessage
+from benchmarks.stats import Recorder
+
+
+async def serve_in_process(host: str = "127.0.0.1") -> Tuple[Any, asyncio.Task, str]:
+    """Run the app under uvicorn on a free port of this event loop. Returns (server, task, base_url)."""
+    import uvicorn
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=0, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, f"http://{host}:{port}"
+
+
+async def _limited(concurrency: int, factories: List[Callable[[], Awaitable[Any]]]) -> List[Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(factory):
+        async with semaphore:
+            return await factory()
+
+    return await asyncio.gather(*(run(factory) for factory in factories))
+
+
+async def _timed(recorder: Recorder, name: str, request: Callable[[], Awaitable[httpx.Response]]) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await request()
+    except Exception:
+        recorder.error(name)
+        return None
+    if response.status_code >= 400:
+        recorder.error(name)
+        return None
+    recorder.record(name, time.perf_counter() - start)
+    return response
+
+
+async def run_rest(
+    client: httpx.AsyncClient, recorder: Recorder, rooms: int, players: int, polls: int, concurrency: int
+) -> List[Tuple[str, List[str]]]:
+    """Create rooms, fill them and poll their state. Returns (room_code, player_ids) per room."""
+    created = await _limited(concurrency, [
+        lambda: _timed(recorder, "create_room", lambda: client.post("/rooms/create"))
+        for _ in range(rooms)
+    ])
+    codes = [response.json()["room_code"] for response in created if response is not None]
+
+    def join(room_code: str, seat: int):
+        return lambda: _timed(
+            recorder,
+            "join_room",
+            lambda: client.post(f"/rooms/{room_code}/join", json={"player_name": f"Bench {seat}"}),
+        )
+
+    joined = await _limited(concurrency, [join(room_code, seat) for room_code in codes for seat in range(players)])
+    tables = []
+    for index, room_code in enumerate(codes):
+        responses = joined[index * players:(index + 1) * players]
+        player_ids = [response.json()["player_id"] for response in responses if response is not None]
+        if len(player_ids) == players:
+            tables.append((room_code, player_ids))
+
+    async def poll(room_code: str, player_id: str):
+        etag = None
+        for _ in range(polls):
+            headers = {"If-None-Match": etag} if etag else {}
+            name = "state_not_modified" if etag else "state"
+            response = await _timed(
+                recorder,
+                name,
+                lambda: client.get(f"/rooms/{room_code}/state", params={"player_id": player_id}, headers=headers),
+            )
+            if response is not None:
+                etag = response.headers.get("etag")
+
+    await _limited(concurrency, [
+        (lambda room_code=room_code, player_id=player_ids[0]: poll(room_code, player_id))
+        for room_code, player_ids in tables
+    ])
+    return tables
+
+
+class Table:
+    """Shared state for the bots playing one room"""
+
+    def __init__(self, players: int, moves: int):
+        self.players = players
+        self.moves_left = moves
+        self.done = asyncio.Event()
+
+
+class Bot:
+    """Plays legal cards for one seat, mirroring just enough of the round from the deltas.
+
+    Latency is measured from sending a command to seeing its event come back
+    in a delta, which covers the actor queue, the broadcast and the socket.
+    """
+
+    def __init__(self, table: Table, seat: int, player_id: str, websocket, codec, recorder: Recorder, move_delay: float):
+        self.table = table
+        self.seat = seat
+        self.player_id = player_id
+        self.websocket = websocket
+        self.codec = codec
+        self.recorder = recorder
+        self.move_delay = move_delay
+        self.hand = 0
+        self.turn: Optional[str] = None
+        self.bids = 0
+        self.led_suit = -1
+        self.spades_broken = False
+        self.ready_players = set()
+        self.started = False
+        self.pending: Optional[Tuple[str, float]] = None
+
+    async def send(self, message_type: str, data: Optional[Dict[str, Any]] = None, expect: Optional[str] = None) -> None:
+        if expect:
+            self.pending = (expect, time.perf_counter())
+        await self.websocket.send(self.codec.encode(WebSocketMessage(type=message_type, data=data)))
+
+    def _answered(self, event_type: str) -> None:
+        if self.pending and self.pending[0] == event_type:
+            self.recorder.record(f"ws_{event_type}", time.perf_counter() - self.pending[1])
+            self.pending = None
+
+    async def run(self) -> None:
+        await self.send("ready", {"is_ready": True}, expect="player_ready")
+        async for frame in self.websocket:
+            message = self.codec.decode(frame)
+            self.handle(message)
+            if self.table.done.is_set():
+                return
+            await self.maybe_move()
+
+    def handle(self, message: WebSocketMessage) -> None:
+        data = message.data or {}
+        if message.type == "hand":
+            self.hand = sum(1 << index for index in data["cards"])
+        elif message.type == "snapshot" and data.get("hand"):
+            self.hand = sum(
+                1 << (card if isinstance(card, int) else card_index(Suit(card["suit"]), card["value"]))
+                for card in data["hand"]
+            )
+        elif message.type == "error":
+            if self.pending:
+                self.recorder.error(f"ws_{self.pending[0]}")
+                self.pending = None
+        elif message.type == "delta":
+            for event in data["events"]:
+                self.apply(event["type"], event["data"])
+
+    def apply(self, event_type: str, data: Dict[str, Any]) -> None:
+        if data.get("player_id") == self.player_id:
+            self._answered(event_type)
+        if event_type == "player_ready":
+            self.ready_players.add(data["player_id"])
+        elif event_type == "game_started":
+            self.started = True
+            self._answered("game_started")
+        elif event_type == "round_started":
+            self.bids = 0
+            self.led_suit = -1
+            self.spades_broken = False
+        elif event_type == "turn_changed":
+            self.turn = data["player_id"]
+        elif event_type == "bid_placed":
+            self.bids += 1
+        elif event_type == "card_played":
+            card = data["card"]
+            if self.led_suit < 0:
+                self.led_suit = card // 13
+            if card // 13 == SPADES:
+                self.spades_broken = True
+            if data["player_id"] == self.player_id:
+                self.hand &= ~(1 << card)
+        elif event_type == "trick_won":
+            self.led_suit = -1
+        elif event_type == "game_over":
+            self.table.done.set()
+
+    def choose_card(self) -> int:
+        hand = self.hand
+        if self.led_suit >= 0:
+            hand = hand & SUIT_MASKS[self.led_suit] or hand
+        elif not self.spades_broken and hand & NON_SPADE_MASK:
+            hand &= NON_SPADE_MASK
+        return (hand & -hand).bit_length() - 1
+
+    async def maybe_move(self) -> None:
+        if self.pending:
+            return
+        if not self.started:
+            if self.seat == 0 and len(self.ready_players) == self.table.players:
+                await self.send("start", expect="game_started")
+            return
+        if self.turn != self.player_id or not self.hand:
+            return
+        if self.table.moves_left <= 0:
+            self.table.done.set()
+            return
+        self.table.moves_left -= 1
+        if self.move_delay:
+            await asyncio.sleep(self.move_delay)
+        if self.bids < self.table.players:
+            await self.send("bid", {"bid": 3}, expect="bid_placed")
+        else:
+            await self.send("play", {"card": self.choose_card()}, expect="card_played")
+
+
+async def play_table(
+    ws_url: str,
+    room_code: str,
+    player_ids: List[str],
+    recorder: Recorder,
+    moves: int,
+    move_delay: float,
+    subprotocol: str,
+    timeout: float,
+) -> None:
+    """Connect every seat of a room over WebSocket and play until ``moves`` have been made"""
+    codec = CODECS.get(subprotocol, JSON_CODEC)
+    table = Table(len(player_ids), moves)
+    websockets = []
+    try:
+        for player_id in player_ids:
+            start = time.perf_counter()
+            websocket = await connect(f"{ws_url}/ws/{room_code}/{player_id}", subprotocols=[subprotocol])
+            await websocket.recv()  # Initial snapshot
+            recorder.record("ws_connect", time.perf_counter() - start)
+            websockets.append(websocket)
+        bots = [
+            Bot(table, seat, player_id, websocket, codec, recorder, move_delay)
+            for seat, (player_id, websocket) in enumerate(zip(player_ids, websockets))
+        ]
+        tasks = [asyncio.create_task(bot.run()) for bot in bots]
+        try:
+            await asyncio.wait_for(table.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            recorder.error("ws_game")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    except Exception:
+        recorder.error("ws_connect")
+    finally:
+        for websocket in websockets:
+            await websocket.close()
+
+
+async def run_ws(
+    base_url: str,
+    tables: List[Tuple[str, List[str]]],
+    recorder: Recorder,
+    moves: int,
+    move_delay: float,
+    concurrency: int,
+    subprotocol: str,
+    timeout: float,
+) -> None:
+    ws_url = "ws" + base_url[len("http"):]
+    await _limited(concurrency, [
+        (lambda room_code=room_code, player_ids=player_ids: play_table(
+            ws_url, room_code, player_ids, recorder, moves, move_delay, subprotocol, timeout
+        ))
+        for room_code, player_ids in tables
+    ])
@@ -0,0 +1,101 @@
+"""Micro-benchmarks for the in-memory hot paths, independent of the database"""
+from typing import Any, Callable, Dict, List, Tuple
+import random
+import timeit
+from app.codec import JSON_CODEC, MSGPACK_CODEC
+from app.mappers.game_mapper import GameMapper
+from app.models.card import Card, Deck, Hand
+from app.models.dealer import deal_batch, make_rng
+from app.models.game_room import GameRoom
+from app.models.rules import Phase
+from app.schemas import WebSocketMessage
+from app.services.state_cache import StateCache
+
+
+def _first_legal(game_room: GameRoom) -> Card:
+    game_round = game_room.round
+    mask = game_round.legal_mask(game_room.current_turn)
+    return Card.from_index((mask & -mask).bit_length() - 1)
+
+
+def _ready_room(seed: int = 0) -> GameRoom:
+    random.seed(seed)
+    game_room = GameRoom("BENCH0")
+    for seat in range(4):
+        game_room.add_player(f"player-{seat}", f"Player {seat}")
+        game_room.set_ready(f"player-{seat}")
+    game_room.start_game()
+    return game_room
+
+
+def _play_round(game_room: GameRoom) -> None:
+    rounds_played = game_room.rounds_played
+    while game_room.rounds_played == rounds_played:
+        if game_room.round.phase == Phase.BIDDING:
+            game_room.place_bid(game_room.current_turn, 3)
+        else:
+            game_room.play_card(game_room.current_turn, _first_legal(game_room))
+
+
+def _mid_trick_room() -> GameRoom:
+    game_room = _ready_room()
+    for _ in range(4):
+        game_room.place_bid(game_room.current_turn, 3)
+    for _ in range(6):
+        game_room.play_card(game_room.current_turn, _first_legal(game_room))
+    return game_room
+
+
+def cases() -> List[Tuple[str, Callable[[], Any]]]:
+    """Named zero-argument callables, each one operation"""
+    deck = Deck()
+    cards = [Card.from_index(index) for index in range(0, 52, 4)]
+    room = _mid_trick_room()
+    game_round = room.round
+    player_id = room.current_turn
+    rng = make_rng(0)
+    cache = StateCache()
+    snapshot = room.snapshot()
+    delta = WebSocketMessage(
+        type="delta",
+        data={"version": room.version, "events": [event.public() for event in list(room.events)[-4:]]},
+    )
+
+    def deck_shuffle_deal():
+        deck.reset()
+        deck.shuffle()
+        deck.draw_many(52)
+
+    def full_round():
+        _play_round(_ready_room())
+
+    return [
+        ("deck_shuffle_deal", deck_shuffle_deal),
+        ("hand_from_13_cards", lambda: Hand.from_cards(cards)),
+        ("legal_mask", lambda: game_round.legal_mask(player_id)),
+        ("deal_batch_1000_rooms", lambda: deal_batch(1000, rng=rng)),
+        ("game_room_full_round", full_round),
+        ("game_state_json", lambda: GameMapper.to_game_state(room, player_id).model_dump_json()),
+        ("state_cache_hit", lambda: cache.get(room, player_id)),
+        ("delta_encode_json", lambda: JSON_CODEC.encode(delta)),
+        ("delta_encode_msgpack", lambda: MSGPACK_CODEC.encode(delta)),
+        ("snapshot_roundtrip", lambda: GameRoom.from_snapshot("BENCH0", room.snapshot())),
+        ("snapshot_restore", lambda: GameRoom.from_snapshot("BENCH0", snapshot)),
+    ]
+
+
+def run(repeat: int = 5, only: List[str] = ()) -> Dict[str, Dict[str, Any]]:
+    """Time every case; the best of ``repeat`` runs is reported to filter out noise"""
+    results = {}
+    for name, func in cases():
+        if only and name not in only:
+            continue
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        results[name] = {
+            "ns_per_op": round(best * 1e9, 1),
+            "ops_per_second": round(1 / best, 1),
+            "loops": number,
+        }
+    return results
@@ -0,0 +1,147 @@
+"""Run the benchmark suite and write the results as JSON.
+
+By default the app is served in this process by uvicorn on a free port,
+against a fresh SQLite database, so the suite runs offline:
+
+    python -m benchmarks.run --rooms 100 --output results.json
+
+Pass ``--database-url postgresql://...`` to use a local Postgres (with
+migrations applied), or ``--url http://127.0.0.1:8000`` to drive a server
+started separately. Compare two result files with ``benchmarks.compare``.
+"""
+from typing import Any, Dict
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+DEFAULT_DATABASE_URL = "sqlite:///./bench.db"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", default="micro,rest,ws", help="comma-separated subset of micro, rest, ws")
+    parser.add_argument("--url", help="base URL of a running server; default is to serve the app in-process")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL, help="database for the in-process server")
+    parser.add_argument("--keep-database", action="store_true", help="do not delete an existing SQLite file first")
+    parser.add_argument("--rooms", type=int, default=50, help="rooms to create")
+    parser.add_argument("--players", type=int, default=4, help="players per room")
+    parser.add_argument("--polls", type=int, default=20, help="state polls per room")
+    parser.add_argument("--moves", type=int, default=60, help="bids and plays per room over WebSocket")
+    parser.add_argument("--move-delay", type=float, default=0.0, help="seconds a bot waits before each move")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests or games in flight at once")
+    parser.add_argument("--codec", choices=["json", "msgpack"], default="json", help="WebSocket encoding")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per WebSocket game")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats per micro-benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed for shuffles, for reproducible games")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _prepare_database(args: argparse.Namespace) -> None:
+    # Settings are read when app.config is first imported, so this must run before any app import
+    os.environ["DATABASE_URL"] = args.database_url
+    # Every bot connects from one address, so per-client and per-room rate limits would shed the load itself
+    os.environ.setdefault("ADMISSION_CLIENT_RATE", "0")
+    os.environ.setdefault("ADMISSION_ROOM_RATE", "0")
+    prefix = "sqlite:///"
+    if args.database_url.startswith(prefix) and not args.keep_database:
+        path = args.database_url[len(prefix):]
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+async def run_load(args: argparse.Namespace, suites) -> Dict[str, Any]:
+    import httpx
+    from app.codec import JSON_SUBPROTOCOL, MSGPACK_SUBPROTOCOL
+    from benchmarks.load import run_rest, run_ws, serve_in_process
+    from benchmarks.stats import Recorder
+
+    server = task = None
+    base_url = args.url
+    if not base_url:
+        server, task, base_url = await serve_in_process()
+    results: Dict[str, Any] = {}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+            recorder = Recorder()
+            tables = await run_rest(client, recorder, args.rooms, args.players, args.polls, args.concurrency)
+            if "rest" in suites:
+                results["rest"] = recorder.summary()
+        if "ws" in suites:
+            recorder = Recorder()
+            subprotocol = MSGPACK_SUBPROTOCOL if args.codec == "msgpack" else JSON_SUBPROTOCOL
+            await run_ws(
+                base_url, tables, recorder, args.moves, args.move_delay, args.concurrency, subprotocol, args.timeout
+            )
+            results["ws"] = recorder.summary()
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await task
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    suites = {suite.strip() for suite in args.suite.split(",") if suite.strip()}
+    if not args.url:
+        _prepare_database(args)
+
+    import random
+    random.seed(args.seed)
+    from benchmarks import micro
+    from benchmarks.stats import format_table
+
+    # The app logs every request at INFO, which would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "target": args.url or "in-process",
+            "database": None if args.url else args.database_url,
+            "args": vars(args),
+        }
+    }
+    if "micro" in suites:
+        report["micro"] = micro.run(repeat=args.repeat)
+        print("micro-benchmarks")
+        for name, row in report["micro"].items():
+            print(f"  {name:<24}{row['ns_per_op']:>14.1f} ns/op{row['ops_per_second']:>16.1f} ops/s")
+    if suites & {"rest", "ws"}:
+        report.update(asyncio.run(run_load(args, suites)))
+        for suite in ("rest", "ws"):
+            if suite in report:
+                print(f"\n{suite}")
+                print(format_table(report[suite]))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+            output.write("\n")
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+from typing import Any, Dict, List
+import math
+import time
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Collects per-operation latencies and errors for one benchmark phase."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.started: Dict[str, float] = {}
+        self.finished: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        now = time.perf_counter()
+        self.started.setdefault(name, now - seconds)
+        self.finished[name] = now
+        self.latencies.setdefault(name, []).append(seconds)
+
+    def error(self, name: str) -> None:
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Throughput and latency percentiles (in milliseconds) per operation"""
+        results = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(name, []))
+            elapsed = self.finished.get(name, 0.0) - self.started.get(name, 0.0)
+            results[name] = {
+                "count": len(values),
+                "errors": self.errors.get(name, 0),
+                "per_second": round(len(values) / elapsed, 1) if elapsed > 0 else None,
+                "mean_ms": round(1000 * sum(values) / len(values), 3) if values else None,
+                "p50_ms": round(1000 * percentile(values, 0.50), 3),
+                "p95_ms": round(1000 * percentile(values, 0.95), 3),
+                "p99_ms": round(1000 * percentile(values, 0.99), 3),
+                "max_ms": round(1000 * values[-1], 3) if values else None,
+            }
+        return results
+
+
+def format_table(results: Dict[str, Dict[str, Any]]) -> str:
+    """Render a summary as a fixed-width table for the terminal"""
+    columns = ["count", "errors", "per_second", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    width = max([len(name) for name in results] + [9])
+    lines = ["operation".ljust(width) + "".join(column.rjust(12) for column in columns)]
+    for name, row in results.items():
+        cells = "".join(("-" if row.get(column) is None else str(row[column])).rjust(12) for column in columns)
+        lines.append(name.ljust(width) + cells)
+    return "\n".join(lines)
@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 setup(
     name="card-game-api",
     version="1.0.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=[
         "fastapi>=0.104.1",
         "uvicorn>=0.24.0",
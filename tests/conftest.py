@@ -0,0 +1,58 @@
+"""Shared fixtures. Tests run against a throwaway SQLite database, created per test."""
+import asyncio
+import os
+import tempfile
+import pytest
+
+# Settings are read when app modules are first imported, so point them at SQLite before that
+_DB_DIR = tempfile.mkdtemp(prefix="spades3-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from app.database import Base, async_engine, engine  # noqa: E402
+from app.models import database_models  # noqa: E402,F401
+from app.models.game_room import GameRoom  # noqa: E402
+from app.models.rules import Phase  # noqa: E402
+from app.models.card import Card  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine on a fresh event loop, closing the async pool's connections after it"""
+
+    def run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await async_engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def seat_players(game_room: GameRoom, count: int = 4) -> list:
+    player_ids = [f"p{seat}" for seat in range(count)]
+    for player_id in player_ids:
+        game_room.add_player(player_id, player_id.upper())
+        game_room.set_ready(player_id)
+    return player_ids
+
+
+def play_moves(game_room: GameRoom, moves: int) -> None:
+    """Make ``moves`` legal bids or plays, always bidding 3 and playing the lowest legal card"""
+    for _ in range(moves):
+        player_id = game_room.round.current_player
+        if game_room.round.phase == Phase.BIDDING:
+            game_room.place_bid(player_id, 3)
+        else:
+            mask = game_room.round.legal_mask(player_id)
+            game_room.play_card(player_id, Card.from_index((mask & -mask).bit_length() - 1))
@@ -0,0 +1,66 @@
+import asyncio
+from app.schemas import WebSocketMessage
+from app.services.cluster import Cluster, HashRing
+from app.services.connection_hub import ConnectionHub
+from app.services.event_bus import LocalEventBus
+
+NODES = ["http://a", "http://b", "http://c"]
+ROOM_CODES = [f"ROOM{index:03}" for index in range(300)]
+
+
+def test_hash_ring_spreads_rooms_over_every_node():
+    ring = HashRing(NODES)
+    owners = [ring.node_for(room_code) for room_code in ROOM_CODES]
+
+    assert set(owners) == set(NODES)
+    assert owners == [HashRing(NODES).node_for(room_code) for room_code in ROOM_CODES]
+
+
+def test_removing_a_node_only_moves_its_rooms():
+    before = HashRing(NODES)
+    after = HashRing(NODES[:2])
+
+    for room_code in ROOM_CODES:
+        if before.node_for(room_code) != NODES[2]:
+            assert after.node_for(room_code) == before.node_for(room_code)
+
+
+def test_each_room_has_exactly_one_owner():
+    clusters = [Cluster(NODES, node) for node in NODES]
+
+    for room_code in ROOM_CODES:
+        assert sum(cluster.owns(room_code) for cluster in clusters) == 1
+    assert Cluster([], "").owns(ROOM_CODES[0])
+
+
+def test_room_messages_only_reach_workers_holding_its_sockets():
+    async def scenario():
+        buses = {node: LocalEventBus() for node in NODES}
+        received = {node: [] for node in NODES}
+        for node, bus in buses.items():
+            Cluster(NODES, node, bus)
+            bus.connect(buses[NODES[0]])
+
+            async def record(event, node=node):
+                received[node].append((event["kind"], event.get("player")))
+
+            bus.subscribe(record)
+            await bus.start()
+        hub = ConnectionHub(bus=buses[NODES[0]], node_id=NODES[0])
+        message = WebSocketMessage(type="delta", data={"version": 1, "events": []})
+
+        hub.broadcast("ROOM01", message)
+        hub.attach_remote("ROOM01", "p1", NODES[1])
+        hub.broadcast("ROOM01", message)
+        hub.send("ROOM01", "p1", message)
+        hub.send("ROOM01", "p2", message)
+        hub.detach_remote("ROOM01", "p1", NODES[1])
+        hub.broadcast("ROOM01", message)
+        await asyncio.sleep(0.01)
+
+        for bus in buses.values():
+            await bus.stop()
+        return received
+
+    received = asyncio.run(scenario())
+    assert received == {NODES[0]: [], NODES[1]: [("broadcast", None), ("send", "p1")], NODES[2]: []}
@@ -0,0 +1,142 @@
+from app.models.card import Hand
+from app.models.events import EVENT_HISTORY
+from app.models.game_room import GameRoom
+from app.schemas import WebSocketMessage
+from app.services.connection_hub import ConnectionHub
+from app.services.game_service import GameService
+from tests.conftest import play_moves, seat_players
+
+
+class RecordingHub(ConnectionHub):
+    """Records what would go out to clients as ``(player_id or None for broadcasts, message)``"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def broadcast(self, room_code, message, exclude=None):
+        self.sent.append((None, message))
+        return 0
+
+    def send(self, room_code, player_id, message):
+        self.sent.append((player_id, message))
+        return True
+
+
+def seated_room():
+    game_room = GameRoom("ROOM01")
+    return game_room, seat_players(game_room)
+
+
+def test_events_since():
+    game_room, _ = seated_room()
+    version = game_room.version
+
+    assert game_room.events_since(version) == []
+    assert [event.version for event in game_room.events_since(3)] == list(range(4, version + 1))
+    assert [event.version for event in game_room.events_since(0)] == list(range(1, version + 1))
+    assert game_room.events_since(version + 1) is None
+
+
+def test_events_since_expired_version_is_none():
+    game_room, _ = seated_room()
+    game_room.start_game()
+    while game_room.version <= EVENT_HISTORY:
+        play_moves(game_room, 1)
+    oldest = game_room.events[0].version
+
+    assert game_room.events_since(0) is None
+    assert game_room.events_since(oldest - 2) is None
+    assert game_room.events_since(oldest - 1)[0].version == oldest
+
+
+def test_publish_broadcasts_delta_and_sends_hands_privately():
+    hub = RecordingHub()
+    service = GameService(hub=hub)
+    game_room, player_ids = seated_room()
+    since = game_room.version
+    game_room.start_game()
+
+    service.publish(game_room, since)
+
+    (recipient, delta), *hands = hub.sent
+    assert recipient is None and delta.type == "delta"
+    assert delta.data["version"] == game_room.version
+    assert [event["v"] for event in delta.data["events"]] == list(range(since + 1, game_room.version + 1))
+    assert "hands" not in str(delta.data)
+    assert sorted(player_id for player_id, _ in hands) == sorted(player_ids)
+    for player_id, message in hands:
+        assert message.type == "hand"
+        assert message.data["cards"] == [card.index for card in Hand(game_room.players[player_id].hand.mask)]
+    assert service.persister.pending(game_room.room_code) is game_room
+
+
+def test_publish_past_event_history_sends_snapshots():
+    hub = RecordingHub()
+    service = GameService(hub=hub)
+    game_room, player_ids = seated_room()
+    since = game_room.version
+    game_room.start_game()
+    while game_room.version - since <= EVENT_HISTORY:
+        play_moves(game_room, 1)
+
+    service.publish(game_room, since)
+
+    assert sorted(player_id for player_id, _ in hub.sent) == sorted(player_ids)
+    assert {message.type for _, message in hub.sent} == {"snapshot"}
+    assert all(message.data["version"] == game_room.version for _, message in hub.sent)
+    assert game_room.room_code in service.persister._snapshots
+
+
+def test_sync_from_retained_version_sends_missing_deltas():
+    hub = RecordingHub()
+    service = GameService(hub=hub)
+    game_room, player_ids = seated_room()
+    game_room.start_game()
+    play_moves(game_room, 2)
+
+    service.sync(game_room, player_ids[0], 5)
+
+    (_, delta), (_, hand) = hub.sent
+    assert delta.type == "delta"
+    assert delta.data["version"] == game_room.version
+    assert [event["v"] for event in delta.data["events"]] == list(range(6, game_room.version + 1))
+    # The deal is among the missed events, so the player's current hand follows
+    assert hand.type == "hand"
+    assert hand.data["version"] == game_room.version
+
+
+def test_sync_from_current_version_sends_empty_delta():
+    hub = RecordingHub()
+    service = GameService(hub=hub)
+    game_room, player_ids = seated_room()
+
+    service.sync(game_room, player_ids[0], game_room.version)
+
+    assert [(message.type, message.data["events"]) for _, message in hub.sent] == [("delta", [])]
+
+
+def test_sync_from_unknown_version_sends_snapshot():
+    hub = RecordingHub()
+    service = GameService(hub=hub)
+    game_room, player_ids = seated_room()
+    game_room.start_game()
+    play_moves(game_room, 1)
+
+    service.sync(game_room, player_ids[0], game_room.version + 10)
+
+    [(player_id, snapshot)] = hub.sent
+    assert player_id == player_ids[0]
+    assert snapshot.type == "snapshot"
+    assert snapshot.data["version"] == game_room.version
+
+
+def test_malformed_sync_version_is_reported_to_the_player():
+    hub = RecordingHub()
+    service = GameService(hub=hub)
+    game_room, player_ids = seated_room()
+
+    for version in ("latest", -1, None):
+        service._handle_command(game_room, player_ids[0], WebSocketMessage(type="sync", data={"version": version}))
+
+    assert [(player_id, message.type) for player_id, message in hub.sent] == [(player_ids[0], "error")] * 3
@@ -0,0 +1,140 @@
+import asyncio
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from app.dao.unit_of_work import UnitOfWork
+from app.models.database_models import GameEventDB, GameSnapshotDB
+from app.services.game_service import GameService
+from app.services.persistence import WriteBehindPersister
+from tests.conftest import seat_players
+
+
+class FlakyUnitOfWork(UnitOfWork):
+    """Fails to connect for the first ``failures`` units of work"""
+
+    failures = 0
+
+    async def __aenter__(self) -> UnitOfWork:
+        if FlakyUnitOfWork.failures:
+            FlakyUnitOfWork.failures -= 1
+            raise OperationalError("INSERT", {}, ConnectionRefusedError("database is down"))
+        return await super().__aenter__()
+
+
+async def create_seated_room(service: GameService):
+    async with UnitOfWork() as uow:
+        room_code = await service.create_room(uow)
+    game_room = service.active_games.peek(room_code)
+    seat_players(game_room)
+    return game_room
+
+
+async def count(model, game_room) -> int:
+    async with UnitOfWork() as uow:
+        result = await uow.session.execute(
+            select(func.count()).select_from(model).where(model.game_room_id == game_room.db_id)
+        )
+        return result.scalar_one()
+
+
+def test_flush_writes_every_dirty_room_once(db, run):
+    async def scenario():
+        persister = WriteBehindPersister()
+        service = GameService(persister=persister)
+        rooms = [await create_seated_room(service) for _ in range(3)]
+        for game_room in rooms:
+            # Changes marked in halves still flush as one set of rows
+            events = list(game_room.events)
+            persister.mark_dirty(game_room, events=events[:4])
+            persister.mark_dirty(game_room, events=events[4:])
+
+        assert await persister.flush() == 3
+        assert persister.dirty_count == 0
+        assert persister.flushes == 1
+        assert await persister.flush() == 0
+        return rooms, [await count(GameEventDB, game_room) for game_room in rooms]
+
+    rooms, event_counts = run(scenario())
+    assert event_counts == [game_room.version for game_room in rooms]
+
+
+def test_unreachable_database_requeues_whole_batch(db, run):
+    async def scenario():
+        persister = WriteBehindPersister(uow_factory=FlakyUnitOfWork)
+        service = GameService(persister=persister)
+        game_room = await create_seated_room(service)
+        persister.mark_dirty(game_room, events=list(game_room.events)[:4])
+
+        FlakyUnitOfWork.failures = 1
+        assert await persister.flush() == 0
+        assert persister.pending(game_room.room_code) is game_room
+        # Events marked after the failure follow the requeued ones
+        persister.mark_dirty(game_room, events=list(game_room.events)[4:])
+
+        assert await persister.flush() == 1
+        assert persister.rooms_dropped == 0
+        return game_room, await count(GameEventDB, game_room)
+
+    game_room, event_count = run(scenario())
+    assert event_count == game_room.version
+
+
+def test_rejected_room_is_isolated_then_dropped_for_a_snapshot(db, run):
+    async def scenario():
+        persister = WriteBehindPersister(max_attempts=2)
+        service = GameService(persister=persister)
+        good, bad = await create_seated_room(service), await create_seated_room(service)
+        # A stray row at version 1 makes every write of the bad room's log fail
+        async with UnitOfWork() as uow:
+            await uow.events.append_events([
+                {"game_room_id": bad.db_id, "version": 1, "type": "player_left", "data": {}, "private": None}
+            ])
+        for game_room in (good, bad):
+            persister.mark_dirty(game_room, events=list(game_room.events))
+
+        # The good room is written despite the bad one; the bad one is retried
+        assert await persister.flush() == 1
+        assert persister.pending(good.room_code) is None
+        assert persister.pending(bad.room_code) is bad
+
+        # Out of attempts: the events are dropped and a snapshot queued in their place
+        assert await persister.flush() == 0
+        assert persister.rooms_dropped == 1
+        assert persister.pending(bad.room_code) is bad
+        assert bad.room_code in persister._snapshots
+
+        assert await persister.flush() == 1
+        assert persister.dirty_count == 0
+        async with UnitOfWork() as uow:
+            snapshots = await uow.events.get_latest_snapshots([bad.db_id])
+        return good, bad, await count(GameEventDB, good), snapshots[bad.db_id]
+
+    good, bad, good_events, snapshot = run(scenario())
+    assert good_events == good.version
+    assert snapshot.version == bad.version
+    assert snapshot.state == bad.snapshot()
+
+
+def test_room_stays_pending_while_its_flush_is_in_flight(db, run):
+    async def scenario():
+        release = asyncio.Event()
+
+        class BlockingUnitOfWork(UnitOfWork):
+            async def __aenter__(self) -> UnitOfWork:
+                await release.wait()
+                return await super().__aenter__()
+
+        persister = WriteBehindPersister(uow_factory=BlockingUnitOfWork)
+        service = GameService(persister=persister)
+        game_room = await create_seated_room(service)
+        persister.mark_dirty(game_room, events=list(game_room.events))
+
+        flush = asyncio.create_task(persister.flush())
+        await asyncio.sleep(0)
+        assert persister.dirty_count == 0
+        assert persister.pending(game_room.room_code) is game_room
+
+        release.set()
+        assert await flush == 1
+        assert persister.pending(game_room.room_code) is None
+
+    run(scenario())
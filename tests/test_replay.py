@@ -0,0 +1,67 @@
+from app.dao.unit_of_work import UnitOfWork
+from app.models.game_room import GameRoom
+from app.services.game_service import GameService
+from app.services.persistence import WriteBehindPersister
+from tests.conftest import play_moves, seat_players
+
+
+def replay(events, snapshot=None) -> GameRoom:
+    game_room = GameRoom.from_snapshot("ROOM01", snapshot) if snapshot else GameRoom("ROOM01")
+    for event in events:
+        game_room.apply(event)
+    return game_room
+
+
+def test_replay_from_empty_room_equals_live_state():
+    game_room = GameRoom("ROOM01")
+    seat_players(game_room)
+    assert replay(game_room.events).snapshot() == game_room.snapshot()
+
+    game_room.start_game()
+    for _ in range(12):
+        play_moves(game_room, 3)
+        assert replay(game_room.events).snapshot() == game_room.snapshot()
+
+
+def test_replay_from_snapshot_equals_live_state():
+    game_room = GameRoom("ROOM01")
+    seat_players(game_room)
+    game_room.start_game()
+    play_moves(game_room, 10)
+    snapshot = game_room.snapshot()
+    version = game_room.version
+    # A finished round exercises scoring and the deal of the next one
+    while game_room.rounds_played < 2:
+        play_moves(game_room, 1)
+
+    rebuilt = replay(game_room.events_since(version), snapshot)
+    assert rebuilt.snapshot() == game_room.snapshot()
+    assert rebuilt.scores == game_room.scores
+
+
+def test_reload_from_database_equals_live_state(db, run):
+    async def scenario():
+        persister = WriteBehindPersister(snapshot_interval=50)
+        service = GameService(persister=persister)
+        async with UnitOfWork() as uow:
+            room_code = await service.create_room(uow)
+        game_room = service.active_games.peek(room_code)
+        seat_players(game_room)
+        game_room.start_game()
+        persister.mark_dirty(game_room, events=list(game_room.events))
+        # Flush as play goes on, across a round boundary and several snapshots
+        while game_room.rounds_played < 2 or game_room.round.tricks_played < 3:
+            version = game_room.version
+            play_moves(game_room, 5)
+            persister.mark_dirty(game_room, events=game_room.events_since(version))
+            await persister.flush()
+
+        async with UnitOfWork() as uow:
+            reloaded = await GameService().load_game(uow, room_code)
+            snapshots = await uow.events.get_latest_snapshots([game_room.db_id])
+        return game_room, reloaded, snapshots[game_room.db_id]
+
+    game_room, reloaded, latest = run(scenario())
+    assert latest.version > 0
+    assert reloaded is not game_room
+    assert reloaded.snapshot() == game_room.snapshot()
@@ -0,0 +1,68 @@
+import asyncio
+from app.dao.unit_of_work import UnitOfWork
+from app.models.game_room import GameRoom
+from app.services.game_service import GameService
+from app.services.persistence import WriteBehindPersister
+from app.services.room_cache import RoomCache
+from tests.conftest import seat_players
+
+
+def test_evicts_least_recently_used_room():
+    evicted = []
+    cache = RoomCache(max_size=2, on_evict=evicted.append)
+    rooms = [GameRoom(room_code) for room_code in ("A", "B", "C")]
+    cache["A"], cache["B"] = rooms[0], rooms[1]
+    cache.get("A")
+    cache["C"] = rooms[2]
+
+    assert evicted == [rooms[1]]
+    assert list(cache) == ["A", "C"]
+    assert cache.evictions == 1
+
+
+def test_pop_is_not_an_eviction():
+    evicted = []
+    cache = RoomCache(on_evict=evicted.append)
+    cache["A"] = GameRoom("A")
+
+    assert cache.pop("A").room_code == "A"
+    assert evicted == []
+
+
+def test_evicted_room_is_not_reloaded_while_its_flush_is_in_flight(db, run):
+    async def scenario():
+        release = asyncio.Event()
+
+        class BlockingUnitOfWork(UnitOfWork):
+            async def __aenter__(self) -> UnitOfWork:
+                await release.wait()
+                return await super().__aenter__()
+
+        service = GameService(
+            persister=WriteBehindPersister(uow_factory=BlockingUnitOfWork),
+            active_games=RoomCache(max_size=1),
+        )
+        async with UnitOfWork() as uow:
+            room_code = await service.create_room(uow)
+        game_room = service.active_games.peek(room_code)
+        seat_players(game_room)
+        game_room.start_game()
+
+        # A second room pushes the first out of the cache, which queues its final flush
+        async with UnitOfWork() as uow:
+            await service.create_room(uow)
+        assert room_code not in service.active_games
+
+        flush = asyncio.create_task(service.persister.flush())
+        await asyncio.sleep(0)
+        assert service.persister.dirty_count == 0
+
+        # The rows lack the in-flight write, so the room must come back from memory
+        async with UnitOfWork() as uow:
+            reloaded = await service.get_room(uow, room_code)
+        release.set()
+        await flush
+        return game_room, reloaded
+
+    game_room, reloaded = run(scenario())
+    assert reloaded is game_room